@@ -0,0 +1,54 @@
+import argparse
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import ltmb
+from ltmb.data import ColumnarWriter, ColumnarDataset
+from ltmb.policies import ExpertHallwayPolicy, ExpertOrderingPolicy, ExpertCountingPolicy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from generate_data import collect_trajectories
+
+EXPERTS = {
+    'LTMB-Hallway-v0': ExpertHallwayPolicy,
+    'LTMB-Ordering-v0': ExpertOrderingPolicy,
+    'LTMB-Counting-v0': ExpertCountingPolicy,
+}
+
+def dataset_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the size of each dataset format and image encoding.')
+    parser.add_argument('--env', type=str, nargs='+', default=list(EXPERTS), choices=list(EXPERTS), help='Gym environment names.')
+    parser.add_argument('--runs', type=int, default=1000, help='Number of trajectories per environment.')
+    parser.add_argument('--length', type=int, default=10, help='Length of the task.')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        for env_name in args.env:
+            options = {'length': args.length}
+            trajectories, _, _ = collect_trajectories(env_name, EXPERTS[env_name], args.runs, options, seeds=list(range(args.runs)))
+            pickle_size = len(pickle.dumps(trajectories))
+
+            sizes = {}
+            for image_encoding in ['raw', 'dedup']:
+                path = os.path.join(tmp, f'{env_name}-{image_encoding}')
+                with ColumnarWriter(path, env_name, options, image_encoding=image_encoding) as writer:
+                    for trajectory, memory_associations in trajectories:
+                        writer.add_episode(trajectory, memory_associations)
+                sizes[image_encoding] = dataset_size(path)
+                dataset = ColumnarDataset(path)
+                image_size = sum(size for name, size in dataset.nbytes().items() if name in ('image', 'frames', 'frame_index'))
+                print(f"{env_name} {image_encoding:5s}: {sizes[image_encoding] / 2**20:7.2f} MiB, images {image_size / 2**20:7.2f} MiB")
+
+            print(f"{env_name} pickle: {pickle_size / 2**20:7.2f} MiB, "
+                  f"raw {pickle_size / sizes['raw']:.1f}x smaller, dedup {pickle_size / sizes['dedup']:.1f}x smaller")
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main()
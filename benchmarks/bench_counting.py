@@ -0,0 +1,39 @@
+import argparse
+import time
+from ltmb.envs import CountingEnv
+from ltmb.policies import ExpertCountingPolicy
+
+def time_steps(length, episodes):
+    # Time CountingEnv.step and ExpertCountingPolicy.select_action separately, over whole episodes
+    env = CountingEnv(length=length)
+    env_time, policy_time, num_steps = 0.0, 0.0, 0
+    for seed in range(episodes):
+        policy = ExpertCountingPolicy()
+        obs, info = env.reset(seed=seed)
+        done = False
+        while not done:
+            start = time.perf_counter()
+            action = policy.select_action(obs)
+            mid = time.perf_counter()
+            obs, reward, terminated, truncated, info = env.step(action)
+            end = time.perf_counter()
+            done = terminated or truncated
+            policy_time += mid - start
+            env_time += end - mid
+            num_steps += 1
+        assert info['success']
+        policy.get_memory_association_array()
+    return env_time / num_steps, policy_time / num_steps
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the per-step cost of Counting episodes across task lengths.')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[10, 100, 1000, 5000], help='Task lengths to measure.')
+    parser.add_argument('--rooms', type=int, default=20000, help='Approximate number of rooms per length.')
+    args = parser.parse_args()
+
+    for length in args.lengths:
+        env_step, policy_step = time_steps(length, max(1, args.rooms // length))
+        print(f"length {length}: CountingEnv.step {env_step * 1e6:.2f} us, ExpertCountingPolicy.select_action {policy_step * 1e6:.2f} us")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import time
+import tracemalloc
+import gymnasium as gym
+import ltmb
+from ltmb.envs import HallwayEnv
+from ltmb.policies import ExpertHallwayPolicy
+
+def bench(length, lazy_grid, episodes):
+    # peak memory of constructing the env and running one episode, including the per-size layout cache
+    HallwayEnv.layouts.clear()
+    tracemalloc.start()
+    env = gym.make('LTMB-Hallway-v0', length=length, fast_obs=True, lazy_grid=lazy_grid, disable_env_checker=True)
+    env.reset(seed=0)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for seed in range(episodes):
+        env.reset(seed=seed)
+    reset_time = (time.perf_counter() - start) / episodes
+
+    policy = ExpertHallwayPolicy()
+    num_steps = 0
+    start = time.perf_counter()
+    for seed in range(episodes):
+        policy.reset()
+        obs, info = env.reset(seed=seed)
+        done = False
+        while not done:
+            obs, reward, terminated, truncated, info = env.step(policy.select_action(obs))
+            done = terminated or truncated
+            num_steps += 1
+    steps_per_sec = num_steps / (time.perf_counter() - start)
+    env.close()
+    return peak, reset_time, steps_per_sec
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the memory and speed of HallwayEnv with a full and a lazy grid at long lengths.')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[10, 100, 500, 2000, 10000], help='Task lengths to measure.')
+    parser.add_argument('--episodes', type=int, default=5, help='Number of episodes per length.')
+    parser.add_argument('--max_full_length', type=int, default=500, help='Longest length measured with the full grid.')
+    args = parser.parse_args()
+
+    for length in args.lengths:
+        for lazy_grid in (False, True):
+            if not lazy_grid and length > args.max_full_length:
+                continue
+            peak, reset_time, steps_per_sec = bench(length, lazy_grid, args.episodes)
+            grid = 'lazy' if lazy_grid else 'full'
+            print(f"length {length} ({grid} grid): peak {peak / 2**20:.2f} MiB, reset {reset_time * 1e3:.2f} ms, {steps_per_sec:.0f} steps/sec")
+
+if __name__ == '__main__':
+    main()
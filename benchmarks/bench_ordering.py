@@ -0,0 +1,40 @@
+import argparse
+import time
+from ltmb.envs import OrderingEnv
+from ltmb.policies import ExpertOrderingPolicy
+
+def time_queries(length, episodes):
+    # Time OrderingEnv.step and ExpertOrderingPolicy.select_action on the query steps only
+    env = OrderingEnv(length=length)
+    env_time, policy_time, num_queries = 0.0, 0.0, 0
+    for seed in range(episodes):
+        policy = ExpertOrderingPolicy()
+        obs, info = env.reset(seed=seed)
+        done = False
+        while not done:
+            querying = env.timestep >= 18
+            start = time.perf_counter()
+            action = policy.select_action(obs)
+            mid = time.perf_counter()
+            obs, reward, terminated, truncated, info = env.step(action)
+            end = time.perf_counter()
+            done = terminated or truncated
+            if querying:
+                policy_time += mid - start
+                env_time += end - mid
+                num_queries += 1
+        assert info['success']
+    return env_time / num_queries, policy_time / num_queries
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the per-step cost of Ordering queries across task lengths.')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[10, 100, 1000, 10000], help='Task lengths to measure.')
+    parser.add_argument('--queries', type=int, default=20000, help='Approximate number of query steps per length.')
+    args = parser.parse_args()
+
+    for length in args.lengths:
+        env_step, policy_step = time_queries(length, max(1, args.queries // length))
+        print(f"length {length}: OrderingEnv.step {env_step * 1e6:.2f} us, ExpertOrderingPolicy.select_action {policy_step * 1e6:.2f} us")
+
+if __name__ == '__main__':
+    main()
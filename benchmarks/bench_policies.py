@@ -0,0 +1,59 @@
+import argparse
+import time
+import gymnasium as gym
+import ltmb
+from ltmb.policies import ExpertHallwayPolicy, ExpertOrderingPolicy, ExpertCountingPolicy
+
+EXPERTS = {
+    'LTMB-Hallway-v0': ExpertHallwayPolicy,
+    'LTMB-Ordering-v0': ExpertOrderingPolicy,
+    'LTMB-Counting-v0': ExpertCountingPolicy,
+}
+
+def record_observations(env_name, expert, episodes, options):
+    # Record the expert's observations first so that only select_action is timed
+    env = gym.make(env_name, **options)
+    recorded = []
+    policy = expert()
+    for seed in range(episodes):
+        policy.reset()
+        obs, info = env.reset(seed=seed)
+        episode = []
+        done = False
+        while not done:
+            episode.append(obs)
+            obs, reward, terminated, truncated, info = env.step(policy.select_action(obs))
+            done = terminated or truncated
+        recorded.append(episode)
+    env.close()
+    return recorded
+
+def time_policy(expert, recorded, repeats):
+    best = float('inf')
+    num_steps = sum(len(episode) for episode in recorded)
+    policy = expert()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for episode in recorded:
+            policy.reset()
+            for obs in episode:
+                policy.select_action(obs)
+        best = min(best, time.perf_counter() - start)
+    return best / num_steps
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the per-step cost of the expert policies.')
+    parser.add_argument('--env', type=str, nargs='+', default=list(EXPERTS), choices=list(EXPERTS), help='Gym environment names.')
+    parser.add_argument('--episodes', type=int, default=100, help='Number of recorded episodes per environment.')
+    parser.add_argument('--length', type=int, default=20, help='Length of the task.')
+    parser.add_argument('--repeats', type=int, default=5, help='Number of timing repeats, the fastest is reported.')
+    args = parser.parse_args()
+
+    for env_name in args.env:
+        expert = EXPERTS[env_name]
+        recorded = record_observations(env_name, expert, args.episodes, {'length': args.length})
+        per_step = time_policy(expert, recorded, args.repeats)
+        print(f"{expert.__name__}: {per_step * 1e6:.2f} us/step")
+
+if __name__ == '__main__':
+    main()
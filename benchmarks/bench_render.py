@@ -0,0 +1,91 @@
+import argparse
+import time
+import gymnasium as gym
+import numpy as np
+import ltmb
+from minigrid.core.grid import Grid
+from minigrid.minigrid_env import MiniGridEnv
+from ltmb.envs.render import render_pov
+from ltmb.vector import make_batched
+from ltmb.policies import ExpertHallwayPolicy, ExpertOrderingPolicy, ExpertCountingPolicy
+
+EXPERTS = {
+    'LTMB-Hallway-v0': ExpertHallwayPolicy,
+    'LTMB-Ordering-v0': ExpertOrderingPolicy,
+    'LTMB-Counting-v0': ExpertCountingPolicy,
+}
+
+def record_images(env_name, expert, episodes, options):
+    env = gym.make(env_name, **options)
+    images = []
+    policy = expert()
+    for seed in range(episodes):
+        policy.reset()
+        obs, info = env.reset(seed=seed)
+        done = False
+        while not done:
+            images.append(obs['image'])
+            obs, reward, terminated, truncated, info = env.step(policy.select_action(obs))
+            done = terminated or truncated
+    env.close()
+    return np.stack(images)
+
+def time_pov(images, tile_size, batch_size):
+    # minigrid renders a frame by decoding the image back into WorldObjs and drawing it cell by cell
+    start = time.perf_counter()
+    for image in images[:1000]:
+        grid, vis_mask = Grid.decode(image)
+        grid.render(tile_size, agent_pos=(3, 6), agent_dir=3, highlight_mask=vis_mask)
+    per_frame = (time.perf_counter() - start) / min(len(images), 1000)
+
+    out = np.empty((batch_size, 7 * tile_size, 7 * tile_size, 3), dtype=np.uint8)
+    render_pov(images[:1], tile_size) # fill the tile atlas
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        batch = images[i:i + batch_size]
+        render_pov(batch, tile_size, out=out[:len(batch)])
+    return per_frame, (time.perf_counter() - start) / len(images)
+
+def time_top_down(env_name, options, tile_size, num_envs, steps):
+    env = gym.make(env_name, fast_obs=True, disable_env_checker=True, **options).unwrapped
+    env.reset(seed=0)
+    start = time.perf_counter()
+    for _ in range(steps):
+        MiniGridEnv.get_full_render(env, True, tile_size)
+    minigrid_time = (time.perf_counter() - start) / steps
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        env.get_full_render(True, tile_size)
+    env_time = (time.perf_counter() - start) / steps
+
+    batched = make_batched(env_name, num_envs, **options)
+    batched.reset(seed=0)
+    out = batched.render(tile_size)
+    start = time.perf_counter()
+    for _ in range(max(1, steps // num_envs)):
+        batched.render(tile_size, out=out)
+    batched_time = (time.perf_counter() - start) / (max(1, steps // num_envs) * num_envs)
+    return minigrid_time, env_time, batched_time
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare minigrid rendering with the tile atlas renderer.')
+    parser.add_argument('--env', type=str, nargs='+', default=list(EXPERTS), choices=list(EXPERTS), help='Gym environment names.')
+    parser.add_argument('--episodes', type=int, default=50, help='Number of recorded episodes per environment.')
+    parser.add_argument('--length', type=int, default=10, help='Length of the task.')
+    parser.add_argument('--tile_size', type=int, default=12, help='Size of tiles in pixels.')
+    parser.add_argument('--batch_size', type=int, default=1024, help='Number of frames rendered at a time.')
+    parser.add_argument('--num_envs', type=int, default=64, help='Number of episodes of the batched env.')
+    args = parser.parse_args()
+
+    for env_name in args.env:
+        options = {'length': args.length}
+        images = record_images(env_name, EXPERTS[env_name], args.episodes, options)
+        minigrid_pov, atlas_pov = time_pov(images, args.tile_size, args.batch_size)
+        minigrid_full, env_full, batched_full = time_top_down(env_name, options, args.tile_size, args.num_envs, 200)
+        print(f"{env_name} pov: minigrid {1 / minigrid_pov:.0f} frames/sec, atlas {1 / atlas_pov:.0f} frames/sec ({minigrid_pov / atlas_pov:.1f}x)")
+        print(f"{env_name} top-down: minigrid {1 / minigrid_full:.0f} frames/sec, env {1 / env_full:.0f} frames/sec ({minigrid_full / env_full:.1f}x), "
+              f"batched {1 / batched_full:.0f} frames/sec ({minigrid_full / batched_full:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import multiprocessing
+import subprocess
+import sys
+import time
+import gymnasium as gym
+import ltmb
+from ltmb.data.rollout import iter_trajectories
+from ltmb.policies import ExpertHallwayPolicy, ExpertOrderingPolicy, ExpertCountingPolicy
+
+EXPERTS = {
+    'LTMB-Hallway-v0': ExpertHallwayPolicy,
+    'LTMB-Ordering-v0': ExpertOrderingPolicy,
+    'LTMB-Counting-v0': ExpertCountingPolicy,
+}
+MODULES = ['ltmb', 'ltmb.data', 'ltmb.envs', 'ltmb.policies', 'ltmb.data.rollout']
+
+def time_import(module, repeats):
+    # Each import is timed in a fresh interpreter, minus the startup time of the interpreter itself
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.DEVNULL)
+        return time.perf_counter() - start
+    bare = min(run('pass') for _ in range(repeats))
+    return min(run(f'import {module}') for _ in range(repeats)) - bare
+
+def time_make(env_name, repeats):
+    best = float('inf')
+    for seed in range(repeats):
+        start = time.perf_counter()
+        env = gym.make(env_name, fast_obs=True, disable_env_checker=True)
+        env.reset(seed=seed)
+        best = min(best, time.perf_counter() - start)
+        env.close()
+    return best
+
+def time_pool(method, workers):
+    # Time until every worker has collected one short episode, which is dominated by starting the workers
+    multiprocessing.set_start_method(method, force=True)
+    start = time.perf_counter()
+    for _ in iter_trajectories('LTMB-Counting-v0', ExpertCountingPolicy, list(range(workers)), {'length': 5}, workers):
+        pass
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import, env construction and worker pool startup times.')
+    parser.add_argument('--repeats', type=int, default=5, help='Number of timing repeats, the fastest is reported.')
+    parser.add_argument('--workers', type=int, default=4, help='Number of worker processes.')
+    args = parser.parse_args()
+
+    for module in MODULES:
+        print(f"import {module}: {time_import(module, args.repeats) * 1e3:.0f} ms")
+    for env_name in EXPERTS:
+        print(f"{env_name} make + reset: {time_make(env_name, args.repeats) * 1e3:.2f} ms")
+    for method in multiprocessing.get_all_start_methods():
+        print(f"{args.workers} workers ({method}): {time_pool(method, args.workers) * 1e3:.0f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import pickle
+import platform
+import sys
+import time
+import tracemalloc
+import gymnasium as gym
+import minigrid
+import ltmb
+from ltmb.data.rollout import run_episode
+from ltmb.policies import ExpertHallwayPolicy, ExpertOrderingPolicy, ExpertCountingPolicy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from generate_data import collect_trajectories
+
+EXPERTS = {
+    'LTMB-Hallway-v0': ExpertHallwayPolicy,
+    'LTMB-Ordering-v0': ExpertOrderingPolicy,
+    'LTMB-Counting-v0': ExpertCountingPolicy,
+}
+
+# Whether a larger value of each metric is better, used when comparing against a baseline
+HIGHER_IS_BETTER = {
+    'reset_ms': False,
+    'steps_per_sec': True,
+    'peak_kb': False,
+    'episode_kb': False,
+    'episodes_per_sec': True,
+}
+
+def bench_env(env_name, length, episodes, options):
+    env = gym.make(env_name, length=length, **options)
+    expert = EXPERTS[env_name]
+    env.reset(seed=0) # warm up per-size caches
+
+    # reset latency
+    start = time.perf_counter()
+    for seed in range(episodes):
+        env.reset(seed=seed)
+    reset_time = (time.perf_counter() - start) / episodes
+
+    # env.step throughput under the expert policy, excluding the policy's own time
+    step_time, num_steps = 0.0, 0
+    for seed in range(episodes):
+        policy = expert()
+        obs, info = env.reset(seed=seed)
+        done = False
+        while not done:
+            action = policy.select_action(obs)
+            start = time.perf_counter()
+            obs, reward, terminated, truncated, info = env.step(action)
+            step_time += time.perf_counter() - start
+            num_steps += 1
+            done = terminated or truncated
+
+    # memory: peak allocations while running an episode and the size of the recorded trajectory
+    peak, size = 0, 0
+    memory_episodes = min(episodes, 5) # tracemalloc slows everything down
+    for seed in range(memory_episodes):
+        tracemalloc.start()
+        trajectory, _ = run_episode(env, expert(), seed)
+        peak += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        size += len(pickle.dumps(trajectory))
+    env.close()
+
+    return {
+        'reset_ms': reset_time * 1e3,
+        'steps_per_sec': num_steps / step_time,
+        'peak_kb': peak / memory_episodes / 1024,
+        'episode_kb': size / memory_episodes / 1024,
+    }
+
+def bench_collect(env_name, length, episodes):
+    start = time.perf_counter()
+    collect_trajectories(env_name, EXPERTS[env_name], episodes, {'length': length}, seeds=list(range(episodes)))
+    return {'episodes_per_sec': episodes / (time.perf_counter() - start)}
+
+def compare(results, baseline, threshold):
+    """Return the metrics that are worse than the baseline by more than threshold (a fraction)."""
+    regressions = []
+    print('Changes are signed so that positive is an improvement')
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if old is None:
+                continue
+            change = (value - old) / old
+            if HIGHER_IS_BETTER[metric]:
+                change = -change
+            status = 'REGRESSION' if change > threshold else 'ok'
+            print(f"{name:40s} {metric:18s} {old:12.3f} -> {value:12.3f} ({-change:+.1%}) {status}")
+            if change > threshold:
+                regressions.append((name, metric))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure env reset latency, step throughput, memory per episode and dataset collection throughput.')
+    parser.add_argument('--env', type=str, nargs='+', default=list(EXPERTS), choices=list(EXPERTS), help='Gym environment names.')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[5, 10, 30, 50, 100], help='Task lengths to measure.')
+    parser.add_argument('--episodes', type=int, default=20, help='Number of episodes per environment and length.')
+    parser.add_argument('--collect_length', type=int, default=10, help='Task length used for collect_trajectories.')
+    parser.add_argument('--collect_episodes', type=int, default=100, help='Number of episodes collected with collect_trajectories.')
+    parser.add_argument('--fast_obs', action='store_true', help='Measure the environments with fast_obs=True.')
+    parser.add_argument('--output', type=str, default=None, help='Save the results to this JSON file.')
+    parser.add_argument('--baseline', type=str, default=None, help='JSON file of earlier results to compare against.')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Relative slowdown that counts as a regression.')
+    args = parser.parse_args()
+
+    options = {'fast_obs': True, 'disable_env_checker': True} if args.fast_obs else {}
+    results = {}
+    for env_name in args.env:
+        for length in args.lengths:
+            name = f'{env_name}/length={length}'
+            results[name] = bench_env(env_name, length, args.episodes, options)
+            print(name, ' '.join(f'{metric}={value:.3f}' for metric, value in results[name].items()))
+        name = f'collect/{env_name}/length={args.collect_length}'
+        results[name] = bench_collect(env_name, args.collect_length, args.collect_episodes)
+        print(name, ' '.join(f'{metric}={value:.3f}' for metric, value in results[name].items()))
+
+    if args.output is not None:
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'gymnasium': gym.__version__,
+                'minigrid': minigrid.__version__,
+                'episodes': args.episodes,
+                'collect_episodes': args.collect_episodes,
+                'fast_obs': args.fast_obs,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from ltmb.data.associations import MemoryAssociations, to_coo, to_csr, to_dense_mask, to_dense_masks, to_sparse
+from ltmb.data.columnar import ColumnarWriter, ColumnarDataset, convert_pickle
+from ltmb.data.manifest import Manifest, MANIFEST_FILE
+from ltmb.data.pipeline import PipelinedWriter
+from ltmb.data.sampler import LengthBucketSampler
+from ltmb.data.validation import QUARANTINE_FILE, add_quarantine, check_associations, load_quarantine, replay_episode, validate_episodes
\ No newline at end of file
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from array import array
+
+import numpy as np
+
+# Memory associations are (query token, key token) pairs over the interleaved token sequence of an
+# episode, where observation t is token 2t and action t is token 2t + 1. An episode of T steps has
+# 2T tokens and its attention-supervision mask is a (2T, 2T) matrix with True at every pair.
+
+class MemoryAssociations:
+    """Growable int32 store of (query token, key token) pairs."""
+
+    def __init__(self):
+        self.buffer = array('i') # flat query, key, query, key, ...
+
+    def append(self, query, key):
+        self.buffer.append(query)
+        self.buffer.append(key)
+
+    def extend(self, query, keys):
+        """Append (query, key) for every key of an int array, without a Python loop."""
+        pairs = np.empty((len(keys), 2), dtype=np.int32)
+        pairs[:, 0] = query
+        pairs[:, 1] = keys
+        self.buffer.frombytes(pairs.tobytes())
+
+    def __len__(self):
+        return len(self.buffer) // 2
+
+    def to_array(self):
+        """Return a copy of the pairs as an int32 array of shape (N, 2)."""
+        return np.array(self.buffer, dtype=np.int32).reshape(-1, 2)
+
+    def tolist(self):
+        """Return the pairs as a list of tuples, the layout of the pickled datasets."""
+        return list(zip(self.buffer[::2], self.buffer[1::2]))
+
+def _linear_indices(associations, num_tokens):
+    # Sorted, de-duplicated row-major indices of the pairs in a (num_tokens, num_tokens) matrix
+    associations = np.asarray(associations, dtype=np.int64).reshape(-1, 2)
+    if len(associations) and associations.max() >= num_tokens:
+        raise ValueError(f'memory associations reference tokens beyond num_tokens={num_tokens}')
+    return np.unique(associations[:, 0] * num_tokens + associations[:, 1])
+
+def to_coo(associations, num_tokens):
+    """Return the (rows, cols) int64 index arrays of the attention mask, sorted by row and column."""
+    indices = _linear_indices(associations, num_tokens)
+    return indices // num_tokens, indices % num_tokens
+
+def to_csr(associations, num_tokens):
+    """Return the (indptr, indices) int64 arrays of the attention mask in compressed sparse row layout."""
+    rows, cols = to_coo(associations, num_tokens)
+    indptr = np.zeros(num_tokens + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_tokens), out=indptr[1:])
+    return indptr, cols
+
+def to_dense_mask(associations, num_tokens):
+    """Return the attention mask as a (num_tokens, num_tokens) boolean array."""
+    mask = np.zeros((num_tokens, num_tokens), dtype=bool)
+    associations = np.asarray(associations, dtype=np.int64).reshape(-1, 2)
+    mask[associations[:, 0], associations[:, 1]] = True
+    return mask
+
+def to_dense_masks(associations_list, num_tokens):
+    """Stack the attention masks of several episodes into a (B, num_tokens, num_tokens) boolean array.
+
+    num_tokens should be at least twice the length of the longest episode; shorter episodes are padded with False.
+    """
+    masks = np.zeros((len(associations_list), num_tokens, num_tokens), dtype=bool)
+    for i, associations in enumerate(associations_list):
+        associations = np.asarray(associations, dtype=np.int64).reshape(-1, 2)
+        masks[i, associations[:, 0], associations[:, 1]] = True
+    return masks
+
+def to_sparse(associations, num_tokens, format='csr'):
+    """Return the attention mask as a scipy.sparse matrix of booleans ('csr' or 'coo')."""
+    try:
+        import scipy.sparse
+    except ImportError as e:
+        raise ImportError('to_sparse requires scipy, use to_csr or to_coo for plain index arrays') from e
+
+    rows, cols = to_coo(associations, num_tokens)
+    matrix = scipy.sparse.coo_matrix((np.ones(len(rows), dtype=bool), (rows, cols)), shape=(num_tokens, num_tokens))
+    return matrix.asformat(format)
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+
+from ltmb.data.associations import to_coo, to_csr, to_dense_mask, to_sparse
+
+# On-disk layout of a columnar dataset directory. Every column is a raw little-endian array
+# so that it can be opened with np.memmap. Per-step columns are indexed by episode_offsets
+# and memory associations are indexed by memory_offsets.
+#
+# Images are stored with one of two encodings:
+#   raw:   one image per step in the image column
+#   dedup: every distinct image is stored once in the frames column, and frame_index holds
+#          the frame of each step. Most frames of a task repeat across steps and episodes.
+FORMAT_NAME = 'ltmb-columnar'
+FORMAT_VERSION = 2 # version 1 had no image_encoding and always stored raw images
+META_FILE = 'meta.json'
+IMAGE_ENCODINGS = ('raw', 'dedup')
+COLUMNS = {
+    'image': (np.uint8, (7, 7, 3)),
+    'frames': (np.uint8, (7, 7, 3)),
+    'frame_index': (np.uint32, ()),
+    'direction': (np.uint8, ()),
+    'action': (np.uint8, ()),
+    'episode_offsets': (np.int64, ()),
+    'memory_associations': (np.int32, (2,)),
+    'memory_offsets': (np.int64, ()),
+}
+
+def _column_path(path, name):
+    return os.path.join(path, name + '.bin')
+
+def _columns(image_encoding):
+    # Columns stored for a given image encoding
+    image_columns = ['image'] if image_encoding == 'raw' else ['frames', 'frame_index']
+    return image_columns + ['direction', 'action', 'episode_offsets', 'memory_associations', 'memory_offsets']
+
+def seeds_hash(seeds):
+    """Return a short hash of a list of episode seeds, stored in meta.json to check that a resumed run collects the same episodes."""
+    return hashlib.sha256(np.asarray(seeds, dtype=np.int64).tobytes()).hexdigest()[:16]
+
+def _open_column(path, name, length, mode='r'):
+    dtype, shape = COLUMNS[name]
+    if length == 0: # np.memmap cannot map an empty file
+        return np.zeros((0,) + shape, dtype=dtype)
+    return np.memmap(_column_path(path, name), dtype=dtype, mode=mode, shape=(length,) + shape)
+
+class ColumnarWriter:
+    """Writes episodes to a columnar dataset directory in chunks of chunk_size episodes.
+
+    meta.json is rewritten after every chunk and only counts fully written chunks, so a dataset
+    left behind by an interrupted run can be reopened with resume=True and extended from there.
+    image_encoding='dedup' stores every distinct image once instead of once per step. If the episode
+    seeds are given, a hash of them is stored as well and a run with other seeds cannot resume.
+    """
+
+    def __init__(self, path, env=None, options=None, chunk_size=100, resume=False, image_encoding='raw', seeds=None):
+        if image_encoding not in IMAGE_ENCODINGS:
+            raise ValueError(f'unknown image encoding {image_encoding}, expected one of {IMAGE_ENCODINGS}')
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.env = env
+        self.options = dict(options or {})
+        self.chunk_size = chunk_size
+        self.image_encoding = image_encoding
+        self.seeds_hash = seeds_hash(seeds) if seeds is not None else None
+        self.columns = _columns(image_encoding)
+        self.mission = None
+        self.num_episodes = 0
+        self.num_steps = 0
+        self.num_associations = 0
+        self.num_frames = 0
+        self.frame_ids = {} # maps the bytes of each stored frame to its index in the frames column
+        self.buffer = []
+
+        meta_path = os.path.join(path, META_FILE)
+        if resume and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta['env'] != self.env or meta['options'] != self.options or meta.get('image_encoding', 'raw') != image_encoding:
+                raise ValueError(f'cannot resume {path}: it was collected with different settings')
+            # Datasets written without seeds (or before they were recorded) cannot be checked
+            if self.seeds_hash is not None and meta.get('seeds_hash') not in (None, self.seeds_hash):
+                raise ValueError(f'cannot resume {path}: it was collected with different seeds')
+            if self.seeds_hash is None:
+                self.seeds_hash = meta.get('seeds_hash')
+            self.mission = meta['mission']
+            self.num_episodes = meta['num_episodes']
+            self.num_steps = meta['num_steps']
+            self.num_associations = meta['num_associations']
+            self.num_frames = meta.get('num_frames', 0)
+            # Drop anything written after the last completed chunk
+            for name, length in self._column_lengths().items():
+                with open(_column_path(path, name), 'r+b') as f:
+                    f.truncate(length * np.dtype(COLUMNS[name][0]).itemsize * int(np.prod(COLUMNS[name][1])))
+            if image_encoding == 'dedup':
+                frames = _open_column(path, 'frames', self.num_frames)
+                self.frame_ids = {frame.tobytes(): i for i, frame in enumerate(frames)}
+                del frames
+            self.files = {name: open(_column_path(path, name), 'ab') for name in self.columns}
+        else:
+            self.files = {name: open(_column_path(path, name), 'wb') for name in self.columns}
+            self.files['episode_offsets'].write(np.zeros(1, dtype=np.int64).tobytes())
+            self.files['memory_offsets'].write(np.zeros(1, dtype=np.int64).tobytes())
+            self._write_meta(complete=False)
+
+    def _column_lengths(self):
+        lengths = {
+            'image': self.num_steps,
+            'frames': self.num_frames,
+            'frame_index': self.num_steps,
+            'direction': self.num_steps,
+            'action': self.num_steps,
+            'episode_offsets': self.num_episodes + 1,
+            'memory_associations': self.num_associations,
+            'memory_offsets': self.num_episodes + 1,
+        }
+        return {name: lengths[name] for name in self.columns}
+
+    def _write_meta(self, complete):
+        meta = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'env': self.env,
+            'options': self.options,
+            'mission': self.mission,
+            'image_encoding': self.image_encoding,
+            'seeds_hash': self.seeds_hash,
+            'num_episodes': self.num_episodes,
+            'num_steps': self.num_steps,
+            'num_associations': self.num_associations,
+            'num_frames': self.num_frames,
+            'complete': complete,
+        }
+        # Write to a temporary file first so an interruption never leaves a truncated meta.json behind
+        tmp_path = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    def add_episode(self, trajectory, memory_associations):
+        """Append one episode given as a list of (obs, action) pairs and its memory associations."""
+        if self.mission is None:
+            self.mission = trajectory[0][0]['mission']
+        assert all(obs['mission'] == self.mission for obs, _ in trajectory), 'all episodes must share one mission'
+
+        images = np.stack([obs['image'] for obs, _ in trajectory]).astype(np.uint8, copy=False)
+        directions = np.array([obs['direction'] for obs, _ in trajectory], dtype=np.uint8)
+        actions = np.array([int(action) for _, action in trajectory], dtype=np.uint8)
+        associations = np.asarray(memory_associations, dtype=np.int32).reshape(-1, 2)
+        self.add_arrays(images, directions, actions, associations)
+
+    def add_arrays(self, images, directions, actions, memory_associations):
+        """Append one episode given as per-step arrays."""
+        self.buffer.append((
+            np.ascontiguousarray(images, dtype=np.uint8),
+            np.ascontiguousarray(directions, dtype=np.uint8),
+            np.ascontiguousarray(actions, dtype=np.uint8),
+            np.ascontiguousarray(memory_associations, dtype=np.int32).reshape(-1, 2),
+        ))
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered episodes to disk and commit them in meta.json."""
+        if not self.buffer:
+            return
+        num_steps, num_associations = self.num_steps, self.num_associations
+        episode_offsets, memory_offsets = [], []
+        for images, directions, actions, memory_associations in self.buffer:
+            if self.image_encoding == 'raw':
+                self.files['image'].write(images.tobytes())
+            else:
+                self.files['frame_index'].write(self._dedup(images).tobytes())
+            self.files['direction'].write(directions.tobytes())
+            self.files['action'].write(actions.tobytes())
+            self.files['memory_associations'].write(memory_associations.tobytes())
+            num_steps += len(actions)
+            num_associations += len(memory_associations)
+            episode_offsets.append(num_steps)
+            memory_offsets.append(num_associations)
+        self.files['episode_offsets'].write(np.array(episode_offsets, dtype=np.int64).tobytes())
+        self.files['memory_offsets'].write(np.array(memory_offsets, dtype=np.int64).tobytes())
+        for f in self.files.values():
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.num_episodes += len(self.buffer)
+        self.num_steps, self.num_associations = num_steps, num_associations
+        self.num_frames = len(self.frame_ids)
+        self.buffer = []
+        self._write_meta(complete=False)
+
+    def _dedup(self, images):
+        # Append unseen images to the frames column and return the frame index of every image
+        index = np.empty(len(images), dtype=np.uint32)
+        for t, image in enumerate(images):
+            key = image.tobytes()
+            frame = self.frame_ids.get(key)
+            if frame is None:
+                frame = self.frame_ids[key] = len(self.frame_ids)
+                self.files['frames'].write(key)
+            index[t] = frame
+        return index
+
+    def close(self, complete=True):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+        if complete:
+            self._write_meta(complete=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        # Buffered episodes are complete and can be kept, but the dataset is only marked complete on success
+        self.close(complete=exc_type is None)
+
+class ColumnarDataset:
+    """Memory-mapped view of a columnar dataset directory.
+
+    Episodes are returned as zero-copy slices of the underlying memmaps, except for the images of
+    datasets with image_encoding='dedup', which are gathered from the frames column on access. The
+    last cache_size episodes returned are kept in an LRU cache.
+
+    Columns are only mapped on first access and are not pickled, so a dataset sent to DataLoader
+    worker processes is shipped as its path and each worker maps the files itself.
+    """
+
+    def __init__(self, path, cache_size=256):
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != FORMAT_NAME:
+            raise ValueError(f'{path} is not an {FORMAT_NAME} dataset')
+        if self.meta.get('version', 1) > FORMAT_VERSION:
+            raise ValueError(f'{path} was written by a newer version of ltmb (format version {self.meta["version"]})')
+
+        self.path = path
+        self.env = self.meta['env']
+        self.options = self.meta['options']
+        self.mission = self.meta['mission']
+        self.image_encoding = self.meta.get('image_encoding', 'raw')
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def _open_columns(self):
+        num_episodes, num_steps = self.meta['num_episodes'], self.meta['num_steps']
+        lengths = {
+            'image': num_steps,
+            'frames': self.meta.get('num_frames', 0),
+            'frame_index': num_steps,
+            'direction': num_steps,
+            'action': num_steps,
+            'episode_offsets': num_episodes + 1,
+            'memory_associations': self.meta['num_associations'],
+            'memory_offsets': num_episodes + 1,
+        }
+        for name in _columns(self.image_encoding):
+            self.__dict__[name] = _open_column(self.path, name, lengths[name])
+
+    def __getattr__(self, name):
+        # Only called for missing attributes: map the columns on first use
+        if name in COLUMNS and 'meta' in self.__dict__ and name in _columns(self.image_encoding):
+            self._open_columns()
+            return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __getstate__(self):
+        # Pickling a memmap copies its contents, so only the metadata is pickled
+        state = {k: v for k, v in self.__dict__.items() if k not in COLUMNS}
+        state['cache'] = OrderedDict()
+        return state
+
+    def __len__(self):
+        return self.meta['num_episodes']
+
+    def nbytes(self):
+        """Size in bytes of each column file."""
+        return {name: os.path.getsize(_column_path(self.path, name)) for name in _columns(self.image_encoding)}
+
+    def episode_lengths(self):
+        return np.diff(self.episode_offsets)
+
+    def episode(self, i):
+        """Return the columns of episode i as a dict of arrays."""
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f'episode index {i} out of range')
+        if i in self.cache:
+            self.cache.move_to_end(i)
+            return self.cache[i]
+
+        start, end = self.episode_offsets[i], self.episode_offsets[i + 1]
+        m_start, m_end = self.memory_offsets[i], self.memory_offsets[i + 1]
+        if self.image_encoding == 'raw':
+            image = self.image[start:end]
+        else:
+            image = self.frames[self.frame_index[start:end]]
+            image.flags.writeable = False # cached episodes are shared between callers
+        episode = {
+            'image': image,
+            'direction': self.direction[start:end],
+            'action': self.action[start:end],
+            'memory_associations': self.memory_associations[m_start:m_end],
+        }
+        if self.cache_size > 0:
+            self.cache[i] = episode
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return episode
+
+    __getitem__ = episode
+
+    def attention_mask(self, i, format='dense'):
+        """Return the attention-supervision mask of episode i over its 2 * length obs/action tokens.
+
+        format is 'dense' for a boolean array, 'coo' for (rows, cols), 'csr' for (indptr, indices),
+        or 'scipy_csr' / 'scipy_coo' for a scipy.sparse matrix.
+        """
+        episode = self.episode(i)
+        num_tokens = 2 * len(episode['action'])
+        if format == 'dense':
+            return to_dense_mask(episode['memory_associations'], num_tokens)
+        elif format == 'coo':
+            return to_coo(episode['memory_associations'], num_tokens)
+        elif format == 'csr':
+            return to_csr(episode['memory_associations'], num_tokens)
+        elif format in ('scipy_csr', 'scipy_coo'):
+            return to_sparse(episode['memory_associations'], num_tokens, format=format[len('scipy_'):])
+        raise ValueError(f'unknown attention mask format {format}')
+
+    def trajectory(self, i):
+        """Return episode i in the legacy (trajectory, memory_associations) pickle layout."""
+        from minigrid.core.actions import Actions # imported here because minigrid imports pygame
+        episode = self.episode(i)
+        trajectory = [
+            ({'image': np.array(image), 'direction': int(direction), 'mission': self.mission}, Actions(int(action)))
+            for image, direction, action in zip(episode['image'], episode['direction'], episode['action'])
+        ]
+        memory_associations = [tuple(pair) for pair in episode['memory_associations'].tolist()]
+        return trajectory, memory_associations
+
+def convert_pickle(src, dst, env=None, options=None, image_encoding='raw'):
+    """Convert a legacy pickled list of (trajectory, memory_associations) tuples into a columnar dataset."""
+    with open(src, 'rb') as f:
+        trajectories = pickle.load(f)
+    with ColumnarWriter(dst, env, options, image_encoding=image_encoding) as writer:
+        for trajectory, memory_associations in trajectories:
+            writer.add_episode(trajectory, memory_associations)
+    return ColumnarDataset(dst)
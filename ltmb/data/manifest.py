@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+
+# gymnasium and the envs are only imported when episodes are regenerated, so that loading a manifest
+# (or ltmb.data) in a training process does not pay for importing gymnasium, minigrid and pygame
+
+MANIFEST_NAME = 'ltmb-manifest'
+MANIFEST_FILE = 'manifest.json' # name of the manifest inside a columnar dataset directory
+
+class Manifest:
+    """Recipe of a dataset: the env id, its options, the expert policy and one seed per episode.
+
+    Episode k is regenerated on demand by rolling out the expert on seeds[k], so a dataset can be
+    streamed without being stored, or a stored dataset can be checked against its regeneration.
+    Episodes are returned in the layout of ColumnarDataset.episode.
+    """
+
+    def __init__(self, env, options, seeds, policy, policy_version=None):
+        self.env = env
+        self.options = dict(options)
+        self.seeds = [int(seed) for seed in seeds]
+        self.policy = policy if isinstance(policy, str) else policy.__name__
+        self.policy_version = self._policy_class().version if policy_version is None else policy_version
+        self._env = None
+        self._policy = None
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != MANIFEST_NAME:
+            raise ValueError(f'{path} is not an {MANIFEST_NAME} file')
+        return cls(manifest['env'], manifest['options'], manifest['seeds'], manifest['policy'], manifest['policy_version'])
+
+    def save(self, path):
+        manifest = {
+            'format': MANIFEST_NAME,
+            'env': self.env,
+            'options': self.options,
+            'policy': self.policy,
+            'policy_version': self.policy_version,
+            'seeds': self.seeds,
+        }
+        with open(path, 'w') as f:
+            json.dump(manifest, f)
+
+    def _policy_class(self):
+        import ltmb.policies # imported here because the policies import ltmb.data
+        return getattr(ltmb.policies, self.policy)
+
+    def _expert(self):
+        expert = self._policy_class()
+        if expert.version != self.policy_version:
+            raise ValueError(f'{self.policy} is at version {expert.version} but the manifest was written with version {self.policy_version}')
+        return expert
+
+    def __len__(self):
+        return len(self.seeds)
+
+    def __getstate__(self):
+        # the env is created again in each process that regenerates episodes
+        state = dict(self.__dict__)
+        state['_env'] = None
+        state['_policy'] = None
+        return state
+
+    def episode(self, k):
+        """Regenerate episode k as a dict of arrays."""
+        from ltmb.data.rollout import episode_arrays
+        return episode_arrays(*self.trajectory(k, legacy=False))
+
+    __getitem__ = episode
+
+    def trajectory(self, k, legacy=True):
+        """Regenerate episode k as (trajectory, memory_associations), with the associations as a list of tuples if legacy."""
+        import gymnasium as gym
+        from ltmb.data.rollout import run_episode
+        if self._env is None:
+            self._env = gym.make(self.env, fast_obs=True, disable_env_checker=True, **self.options)
+        if self._policy is None:
+            self._policy = self._expert()()
+        trajectory, memory_associations = run_episode(self._env, self._policy, self.seeds[k])
+        if legacy:
+            memory_associations = [tuple(pair) for pair in memory_associations.tolist()]
+        return trajectory, memory_associations
+
+    def iter_episodes(self, indices=None, workers=1):
+        """Regenerate the given episodes (all by default) with workers processes and yield them in order."""
+        indices = range(len(self)) if indices is None else indices
+        seeds = [self.seeds[k] for k in indices]
+        from ltmb.data.rollout import episode_arrays, iter_trajectories
+        for trajectory, memory_associations in iter_trajectories(self.env, self._expert(), seeds, self.options, workers):
+            yield episode_arrays(trajectory, memory_associations)
+
+    def check(self, dataset, indices=None, workers=1):
+        """Return the indices of the episodes of dataset that differ from their regeneration."""
+        indices = range(len(self)) if indices is None else indices
+        mismatches = []
+        for k, regenerated in zip(indices, self.iter_episodes(indices, workers)):
+            stored = dataset[k]
+            if any(not np.array_equal(stored[name], regenerated[name]) for name in regenerated):
+                mismatches.append(k)
+        return mismatches
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+
+_DONE = object() # sentinel that tells the writer thread to stop
+
+class PipelinedWriter:
+    """Calls write(item) on a background thread fed through a bounded queue.
+
+    The producer keeps collecting episodes while earlier ones are serialized and written to disk.
+    When the queue is full, put() blocks until the writer catches up (backpressure). The time each
+    side spends waiting on the other is recorded in stats().
+    """
+
+    def __init__(self, write, queue_size=64):
+        self.write = write
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.num_items = 0
+        self.put_wait = 0.0 # producer time spent blocked on a full queue
+        self.get_wait = 0.0 # writer time spent waiting on an empty queue
+        self.write_time = 0.0 # writer time spent in write()
+        self.max_size = 0
+        self.start_time = time.perf_counter()
+        self.elapsed = None
+        self.thread = threading.Thread(target=self._run, name='ltmb-writer', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            start = time.perf_counter()
+            item = self.queue.get()
+            got = time.perf_counter()
+            self.get_wait += got - start
+            if item is _DONE:
+                return
+            try:
+                self.write(item)
+            except BaseException as e:
+                self.error = e
+                return
+            self.write_time += time.perf_counter() - got
+            self.num_items += 1
+
+    def put(self, item):
+        start = time.perf_counter()
+        while True:
+            if self.error is not None:
+                raise RuntimeError('the writer thread failed') from self.error
+            try:
+                self.queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.put_wait += time.perf_counter() - start
+        self.max_size = max(self.max_size, self.queue.qsize())
+
+    def close(self):
+        """Wait for every queued item to be written."""
+        if self.thread.is_alive():
+            self.queue.put(_DONE)
+            self.thread.join()
+        self.elapsed = time.perf_counter() - self.start_time
+        if self.error is not None:
+            raise RuntimeError('the writer thread failed') from self.error
+
+    def stats(self):
+        return {
+            'items': self.num_items,
+            'elapsed': self.elapsed if self.elapsed is not None else time.perf_counter() - self.start_time,
+            'write_time': self.write_time,
+            'put_wait': self.put_wait,
+            'get_wait': self.get_wait,
+            'max_queue_size': self.max_size,
+            'queue_size': self.queue.maxsize,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
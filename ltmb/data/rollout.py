@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import collections
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+import traceback
+
+import gymnasium as gym
+import numpy as np
+
+import ltmb # registers the envs
+from ltmb import profiling
+
+class EpisodeError(RuntimeError):
+    """An expert episode that did not succeed."""
+
+def run_episode(env, policy, seed):
+    """Roll out one episode of an expert policy and return (trajectory, memory_associations).
+
+    Raises EpisodeError if the episode does not succeed.
+    """
+    policy.reset() # policy is not markovian and must forget the previous trajectory
+    obs, info = env.reset(seed=seed)
+    done = False
+    trajectory = []
+
+    while not done:
+        action = policy.select_action(obs)
+        trajectory.append((dict(obs, image=obs['image'].copy()), action)) # fast_obs envs reuse the image buffer
+        obs, reward, terminated, truncated, info = env.step(action)
+        done = terminated or truncated
+
+    if not info.get('success', False):
+        ending = f'was truncated after {len(trajectory)} steps' if truncated else f'failed after {len(trajectory)} steps'
+        raise EpisodeError(f'the episode with seed {seed} {ending}')
+    return trajectory, policy.get_memory_association_array()
+
+def episode_arrays(trajectory, memory_associations):
+    """Convert a trajectory to the per-step arrays of ColumnarDataset.episode."""
+    return {
+        'image': np.stack([obs['image'] for obs, _ in trajectory]).astype(np.uint8, copy=False),
+        'direction': np.array([obs['direction'] for obs, _ in trajectory], dtype=np.uint8),
+        'action': np.array([int(action) for _, action in trajectory], dtype=np.uint8),
+        'memory_associations': np.asarray(memory_associations, dtype=np.int32).reshape(-1, 2),
+    }
+
+SHARD_SIZE = 16 # maximum number of episodes a worker collects before handing them back
+TASKS_IN_FLIGHT = 2 # tasks per worker handed out ahead of the consumer
+
+# Each worker process keeps one env per configuration and one policy per expert for its whole lifetime,
+# so shards of different configurations can be collected by the same pool
+_worker_envs = {}
+_worker_policies = {}
+_in_worker = False # set in the processes of a pool by _init_worker
+
+def _init_worker():
+    global _in_worker
+    _in_worker = True
+
+def _worker_rollout(env_name, expert, options):
+    key = (env_name, json.dumps(options, sort_keys=True))
+    if key not in _worker_envs:
+        # fast_obs reuses one image buffer for every observation, which the env checker would warn about
+        _worker_envs[key] = gym.make(env_name, fast_obs=True, disable_env_checker=True, **options)
+    if expert not in _worker_policies:
+        _worker_policies[expert] = expert()
+        if profiling.enabled():
+            profiling.profiler().instrument(_worker_policies[expert], ['select_action'])
+    return _worker_envs[key], _worker_policies[expert]
+
+def _pool_context():
+    # Every worker has to import gymnasium, minigrid and pygame, which takes about half a second. Where workers
+    # are not forked from this process directly (the spawn and forkserver start methods), they are forked from
+    # a server that has imported everything once instead.
+    # get_start_method() would fix the global start method as a side effect, so that callers could no longer set
+    # it. The first of get_all_start_methods() is the platform default.
+    method = multiprocessing.get_start_method(allow_none=True) or multiprocessing.get_all_start_methods()[0]
+    if method == 'spawn' and 'forkserver' in multiprocessing.get_all_start_methods():
+        method = 'forkserver'
+    context = multiprocessing.get_context(method)
+    if method == 'forkserver':
+        context.set_forkserver_preload(['ltmb.data.rollout', 'ltmb.envs', 'ltmb.policies'])
+    return context
+
+def _close_worker_envs():
+    for env in _worker_envs.values():
+        env.close()
+    _worker_envs.clear()
+    _worker_policies.clear()
+
+def _try_episode(env, policy, seed):
+    # A failed episode is returned as (None, failure), so that it does not take down the pool. failure is the
+    # quarantine entry of the episode without its index and seed: its problems, and the traceback of an
+    # exception other than EpisodeError (a bug in the env or the expert rather than an episode that fails)
+    try:
+        return run_episode(env, policy, seed)
+    except EpisodeError as e:
+        return None, {'problems': [str(e)]}
+    except Exception as e:
+        return None, {'problems': [f'the episode with seed {seed} raised {e!r}'], 'traceback': traceback.format_exc()}
+
+def _collect_shard(task):
+    env_name, expert, options, seeds = task
+    start = time.perf_counter()
+    env, policy = _worker_rollout(env_name, expert, options)
+    if not profiling.enabled():
+        trajectories = [_try_episode(env, policy, seed) for seed in seeds]
+        return os.getpid(), trajectories, time.perf_counter() - start, None
+
+    profiler = profiling.profiler()
+    trajectories = []
+    for seed in seeds:
+        with profiler.phase('rollout.episode'):
+            trajectories.append(_try_episode(env, policy, seed))
+    if not _in_worker:
+        # Collected in the main process, which already holds these phases
+        return os.getpid(), trajectories, time.perf_counter() - start, None
+    # The pool would pickle the shard to send it back anyway, so it is pickled here to time it
+    with profiler.phase('rollout.pickle'):
+        trajectories = pickle.dumps(trajectories, protocol=pickle.HIGHEST_PROTOCOL)
+    return os.getpid(), trajectories, time.perf_counter() - start, profiler.drain()
+
+def _canonicalize(obs):
+    # Pickle memoizes by object identity, so the strings and dtypes unpickled from each shard are swapped for
+    # shared ones. This makes the pickled dataset identical for any number of workers.
+    obs = {sys.intern(k): sys.intern(v) if isinstance(v, str) else v for k, v in obs.items()}
+    obs['image'] = obs['image'].view(np.uint8)
+    return obs
+
+def _shard(seeds, size):
+    return [seeds[i:i + size] for i in range(0, len(seeds), size)]
+
+def shard_tasks(env_name, expert, options, seeds, workers=1):
+    """Split the seeds of one configuration into (env_name, expert, options, seeds) tasks for iter_tasks."""
+    # Small shards keep finished episodes flowing to the consumer instead of piling up in the workers
+    size = max(1, min(SHARD_SIZE, len(seeds) // (workers * 8)))
+    return [(env_name, expert, options, shard) for shard in _shard(seeds, size)]
+
+def map_tasks(fn, tasks, workers=1):
+    """Yield fn(task) for every task, in order, computed by a pool of workers processes (in this process if workers is 1).
+
+    fn must be a module-level function. The workers keep their envs and policies between tasks.
+    """
+    if workers <= 1:
+        try:
+            yield from map(fn, tasks)
+        finally:
+            _close_worker_envs()
+        return
+
+    # Only a few tasks per worker are handed out ahead of the consumer. Pool.imap would send every task
+    # at once and buffer all their results, so a consumer that falls behind (a slow writer) would not
+    # slow the workers down and memory would grow with the size of the dataset.
+    pool = _pool_context().Pool(workers, initializer=_init_worker)
+    tasks = iter(tasks)
+    pending = collections.deque(pool.apply_async(fn, (task,)) for task in itertools.islice(tasks, TASKS_IN_FLIGHT * workers))
+    try:
+        while pending:
+            result = pending.popleft().get()
+            for task in itertools.islice(tasks, 1):
+                pending.append(pool.apply_async(fn, (task,)))
+            yield result
+    finally:
+        pool.terminate()
+
+def iter_tasks(tasks, workers=1, worker_stats=None, quarantine=False):
+    """Collect tasks of (env_name, expert, options, seeds) on one pool of workers processes.
+
+    Yields (task index, trajectory, memory_associations) for every seed, in task and seed order, as soon
+    as they are collected. Tasks are started in the order given. An episode that does not succeed raises
+    EpisodeError, or with quarantine is yielded as (task index, None, failure) and collection goes on,
+    where failure is a dict of its problems and, if it raised an exception, the traceback.
+    If given, worker_stats is filled with (episodes, seconds) per worker pid. When profiling is enabled,
+    the phases recorded by the workers are merged into the profiler of this process.
+    """
+    if worker_stats is None:
+        worker_stats = {}
+
+    # Shards are returned in task order, so the output does not depend on the number of workers
+    for k, (pid, shard, elapsed, profile) in enumerate(map_tasks(_collect_shard, tasks, workers)):
+        if profile is not None:
+            profiler = profiling.profiler()
+            with profiler.phase('rollout.unpickle'):
+                shard = pickle.loads(shard)
+            profiler.merge(profile)
+        num_episodes, total_time = worker_stats.get(pid, (0, 0.0))
+        worker_stats[pid] = (num_episodes + len(shard), total_time + elapsed)
+        for trajectory, memory_associations in shard:
+            if trajectory is None:
+                if not quarantine:
+                    raise EpisodeError('\n'.join(memory_associations['problems'] + [memory_associations.get('traceback', '')]).rstrip())
+                yield k, None, memory_associations
+            else:
+                yield k, [(_canonicalize(obs), action) for obs, action in trajectory], memory_associations
+
+def iter_trajectories(env_name, expert, seeds, options={}, workers=1, worker_stats=None, quarantine=False):
+    """Yield (trajectory, memory_associations) for each seed, in seed order, as soon as they are collected.
+
+    memory_associations is an int32 array of (query token, key token) rows. With quarantine, episodes that
+    do not succeed are yielded as (None, failure) instead of raising EpisodeError. If given, worker_stats
+    is filled with (episodes, seconds) per worker pid.
+    """
+    tasks = shard_tasks(env_name, expert, options, seeds, workers)
+    for _, trajectory, memory_associations in iter_tasks(tasks, workers, worker_stats, quarantine):
+        yield trajectory, memory_associations
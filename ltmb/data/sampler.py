@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import numpy as np
+
+class LengthBucketSampler:
+    """Batches of episode indices with similar lengths, to reduce padding when batching sequences.
+
+    Every epoch the episodes are shuffled, split into buckets of bucket_size batches, and sorted by
+    length within each bucket before being cut into batches. The order of the batches is shuffled
+    as well. Can be passed to a torch DataLoader as its batch_sampler.
+    """
+
+    def __init__(self, lengths, batch_size, bucket_size=50, shuffle=True, drop_last=False, seed=0):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.bucket_size = bucket_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def batches(self):
+        rng = np.random.default_rng((self.seed, self.epoch))
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+        bucket = self.batch_size * self.bucket_size
+        batches = []
+        for start in range(0, len(order), bucket):
+            indices = order[start:start + bucket]
+            indices = indices[np.argsort(self.lengths[indices], kind='stable')]
+            batches.extend(indices[i:i + self.batch_size] for i in range(0, len(indices), self.batch_size))
+        if self.drop_last:
+            batches = [batch for batch in batches if len(batch) == self.batch_size]
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return [batch.tolist() for batch in batches]
+
+    def __iter__(self):
+        return iter(self.batches())
+
+    def __len__(self):
+        # only the last batch of each bucket can be short
+        full_buckets, rest = divmod(len(self.lengths), self.batch_size * self.bucket_size)
+        if self.drop_last:
+            return full_buckets * self.bucket_size + rest // self.batch_size
+        return full_buckets * self.bucket_size + -(-rest // self.batch_size)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+import os
+
+import numpy as np
+
+# Episodes are validated by replaying them through their env next to the expert policy, with one env and
+# policy per worker process as in collection. gymnasium, the envs and the policies are only imported by
+# the workers (see ltmb.data.rollout), so importing this module stays cheap.
+
+QUARANTINE_NAME = 'ltmb-quarantine'
+QUARANTINE_FILE = 'quarantine.json' # name of the quarantine inside a columnar dataset directory
+
+def check_associations(memory_associations, num_steps):
+    """Return a problem if memory associations do not link a token to itself or an earlier one among the 2 * num_steps tokens, else None."""
+    memory_associations = np.asarray(memory_associations)
+    if memory_associations.ndim != 2 or memory_associations.shape[1] != 2:
+        return f'memory associations have shape {memory_associations.shape} instead of (N, 2)'
+    query, key = memory_associations[:, 0], memory_associations[:, 1]
+    if np.any(key < 0) or np.any(query >= 2 * num_steps):
+        return f'memory associations point outside of the {2 * num_steps} tokens of the episode'
+    if np.any(key > query):
+        return 'memory associations point from a token to a later one'
+    return None
+
+def replay_episode(env, policy, seed, episode):
+    """Replay a stored episode through env from seed next to the expert policy and return its problems.
+
+    Every observation must match the env's, every action the expert's, the episode must succeed on its
+    last step, and its memory associations must be well formed and the expert's. Replay stops at the
+    first step that disagrees. An empty list means the episode is valid.
+    """
+    policy.reset()
+    obs, info = env.reset(seed=seed)
+    actions = episode['action']
+    problems = []
+    done = False
+    for t in range(len(actions)):
+        if done:
+            problems.append(f'the episode ended after {t} steps but {len(actions)} are stored')
+            break
+        if not np.array_equal(obs['image'], episode['image'][t]) or obs['direction'] != episode['direction'][t]:
+            problems.append(f'observation {t} differs from the env')
+            break
+        action = int(policy.select_action(obs))
+        if action != actions[t]:
+            problems.append(f'action {t} is {actions[t]} but the expert takes {action}')
+            break
+        obs, reward, terminated, truncated, info = env.step(action)
+        done = terminated or truncated
+    else:
+        if not done:
+            problems.append(f'the episode has not ended after its {len(actions)} steps')
+        elif not info.get('success', False):
+            problems.append('the episode does not succeed')
+        if not np.array_equal(policy.get_memory_association_array(), episode['memory_associations']):
+            problems.append("memory associations differ from the expert's")
+
+    problem = check_associations(episode['memory_associations'], len(actions))
+    if problem is not None:
+        problems.append(problem)
+    return problems
+
+def check_seed(env, policy, seed):
+    """Roll out the expert policy on seed and return its problems (an empty list if it succeeds)."""
+    from ltmb.data.rollout import EpisodeError, run_episode
+    try:
+        trajectory, memory_associations = run_episode(env, policy, seed)
+    except EpisodeError as e:
+        return [str(e)]
+    problem = check_associations(memory_associations, len(trajectory))
+    return [] if problem is None else [problem]
+
+def _validate_shard(task):
+    env_name, expert, options, dataset, items = task
+    from ltmb.data.rollout import _worker_rollout
+    env, policy = _worker_rollout(env_name, expert, options)
+    results = []
+    for index, seed in items:
+        # Anything that goes wrong is reported as a problem of the episode, so that one corrupt
+        # episode does not stop the others from being validated
+        try:
+            if dataset is None:
+                problems = check_seed(env, policy, seed)
+            else:
+                problems = replay_episode(env, policy, seed, dataset[index])
+        except Exception as e:
+            problems = [f'replay raised {e!r}']
+        results.append((index, problems))
+    return results
+
+def validate_episodes(manifest, dataset=None, indices=None, workers=1):
+    """Validate the episodes of a dataset against its manifest with workers processes.
+
+    Yields (index, problems) for every episode in indices (all by default), in order, where an empty
+    list of problems means the episode is valid. Without a dataset, the expert is rolled out on the
+    seeds of the manifest instead, which checks that it succeeds on them before they are collected. A dataset
+    that is still being collected holds the episodes of the first seeds only, and only those are validated.
+    """
+    from ltmb.data.rollout import SHARD_SIZE, map_tasks
+    num_episodes = len(manifest)
+    if dataset is not None:
+        if len(dataset) > len(manifest):
+            raise ValueError(f'the dataset has {len(dataset)} episodes but the manifest has {len(manifest)}')
+        num_episodes = len(dataset)
+    indices = range(num_episodes) if indices is None else [k for k in indices if k < num_episodes]
+    items = [(int(k), manifest.seeds[k]) for k in indices]
+    expert = manifest._expert()
+
+    size = max(1, min(SHARD_SIZE, len(items) // (workers * 8)))
+    tasks = [(manifest.env, expert, manifest.options, dataset, items[i:i + size]) for i in range(0, len(items), size)]
+    for results in map_tasks(_validate_shard, tasks, workers):
+        yield from results
+
+def load_quarantine(path):
+    """Return the quarantined episodes recorded in path, as dicts of index (None if never stored), seed and problems."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        quarantine = json.load(f)
+    if quarantine.get('format') != QUARANTINE_NAME:
+        raise ValueError(f'{path} is not an {QUARANTINE_NAME} file')
+    return quarantine['episodes']
+
+def add_quarantine(path, episodes):
+    """Add quarantined episodes to path, replacing earlier entries of the same stored episodes."""
+    indices = {episode['index'] for episode in episodes if episode['index'] is not None}
+    kept = [episode for episode in load_quarantine(path) if episode['index'] is None or episode['index'] not in indices]
+    with open(path, 'w') as f:
+        json.dump({'format': QUARANTINE_NAME, 'episodes': kept + list(episodes)}, f, indent=2)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import numpy as np
+
+from minigrid.core.grid import Grid
+from minigrid.minigrid_env import MiniGridEnv
+from ltmb import profiling
+from ltmb.envs.render import render_pov, render_top_down
+from ltmb.envs.view import AGENT_VIEW_SIZE, EMPTY, PAD, gen_image, padded_encoding
+
+class EncodedGrid(Grid):
+    """Grid that keeps a padded integer encoding of its cells up to date as they are set.
+
+    Objects that change state in place (doors being toggled) must be re-encoded with refresh().
+    """
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.encoding = padded_encoding(width, height)
+
+    def set(self, i, j, v):
+        super().set(i, j, v)
+        self.encoding[i + PAD, j + PAD] = EMPTY if v is None else v.encode()
+
+    def refresh(self, i, j):
+        v = self.get(i, j)
+        self.encoding[i + PAD, j + PAD] = EMPTY if v is None else v.encode()
+
+    def encode(self, vis_mask=None):
+        if vis_mask is not None:
+            return super().encode(vis_mask)
+        return self.encoding[PAD:PAD + self.width, PAD:PAD + self.height].copy()
+
+    def gen_image(self, agent_pos, agent_dir, out=None):
+        """Image observation of the agent at agent_pos facing agent_dir (see ltmb.envs.view.gen_image)."""
+        return gen_image(self.encoding, agent_pos, agent_dir, out)
+
+class LTMBEnv(MiniGridEnv):
+    """Base class of the LTMB tasks.
+
+    With fast_obs=True the image observation is gathered from an integer encoding of the grid that is
+    kept up to date as cells change, instead of slicing, rotating and encoding WorldObj grids on every
+    step. The image is written into a preallocated buffer that is reused by the next step, so copy it
+    if it needs to outlive the step.
+
+    Frames are rendered from the integer encoding with a tile atlas (ltmb.envs.render) instead of
+    drawing the grid cell by cell. The pixels are the same as MiniGridEnv's.
+
+    With profile=True (or a Profiler), or when the LTMB_PROFILE environment variable is set, the
+    methods in PROFILED are timed per call (see ltmb.profiling).
+    """
+
+    PROFILED = ('reset', '_gen_grid', 'step', 'gen_obs')
+
+    def __init__(self, fast_obs=False, profile=None, **kwargs):
+        self.fast_obs = fast_obs
+        self.obs_deferred = False
+        self.obs_image = np.zeros((AGENT_VIEW_SIZE, AGENT_VIEW_SIZE, 3), dtype=np.uint8)
+        super().__init__(**kwargs)
+
+        if profile is None:
+            profile = profiling.enabled()
+        if profile:
+            profiler = profile if isinstance(profile, profiling.Profiler) else profiling.profiler()
+            profiler.instrument(self, self.PROFILED)
+
+    def _new_grid(self, width, height):
+        return EncodedGrid(width, height) if self.fast_obs else Grid(width, height)
+
+    def _step_without_obs(self, action):
+        """MiniGridEnv.step for subclasses that change the grid afterwards and generate the observation themselves."""
+        self.obs_deferred = True
+        try:
+            return super().step(action)
+        finally:
+            self.obs_deferred = False
+
+    def _refresh_front(self):
+        # toggling changes the state of the object in front of the agent without setting the cell
+        fx, fy = self.front_pos
+        if 0 <= fx < self.width and 0 <= fy < self.height:
+            self.grid.refresh(fx, fy)
+
+    def gen_obs(self):
+        if self.obs_deferred:
+            return None
+        if not self.fast_obs:
+            return super().gen_obs()
+
+        self._refresh_front()
+        self.grid.gen_image(self.agent_pos, self.agent_dir, out=self.obs_image)
+        return {'image': self.obs_image, 'direction': self.agent_dir, 'mission': self.mission}
+
+    def get_obs_render(self):
+        return self.get_pov_render(tile_size=self.tile_size)
+
+    def get_pov_render(self, tile_size):
+        if not self.fast_obs:
+            return render_pov(super().gen_obs()['image'], tile_size)
+        self._refresh_front()
+        return render_pov(self.grid.gen_image(self.agent_pos, self.agent_dir), tile_size)
+
+    def get_full_render(self, highlight, tile_size):
+        if self.fast_obs:
+            self._refresh_front()
+        encoding = self.grid.encode()
+        return render_top_down(encoding[None], self.agent_pos, self.agent_dir, tile_size, highlight)[0]
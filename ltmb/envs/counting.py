@@ -1,17 +1,16 @@
 from __future__ import annotations
 
 import numpy as np
-from collections import defaultdict
 
 from minigrid.core.actions import Actions
 from minigrid.core.constants import COLOR_NAMES, TILE_PIXELS
-from minigrid.core.grid import Grid
 from minigrid.core.mission import MissionSpace
-from minigrid.core.world_object import Ball, Key, Box, Door
-from minigrid.manual_control import ManualControl
-from minigrid.minigrid_env import MiniGridEnv
+from minigrid.core.world_object import Ball, Key, Box, Door, Wall
+from ltmb.envs.base import LTMBEnv
+
+class CountingEnv(LTMBEnv):
+    PROFILED = LTMBEnv.PROFILED + ('_update_room',) # room regeneration
 
-class CountingEnv(MiniGridEnv):
     def __init__(self, length=5, test_freq = 0.3, empty_freq = 0.1, tile_size=12, screen_size=640, **kwargs):
         if length < 1:
             raise ValueError('length must be greater than 0')
@@ -22,12 +21,19 @@ class CountingEnv(MiniGridEnv):
 
         self.length = length # number of rooms
         max_steps = 7 * length
-        self.object_count = defaultdict(int) # count of objects
+        self.object_count = [0] * 3 * len(COLOR_NAMES) # count of each (object, color) pair, indexed like self.objects
         self.test_freq = test_freq # frequency of test rooms
         self.empty_freq = empty_freq # frequency of empty object cells
         self.rooms_visited = 1 # number of rooms visited
         self.tile_size = tile_size # size of tiles in pixels
 
+        # Room template cache: every room is built from these objects, so a room transition allocates nothing.
+        # Objects are never picked up or modified, and doors are closed again whenever they are placed.
+        self.wall = Wall()
+        self.doors = {color: Door(color) for color in ['blue', 'green', 'red']}
+        self.objects = [object(color) for object in [Ball, Key, Box] for color in COLOR_NAMES]
+        self.occupied_cells = [] # cells of the current room that differ from an empty room
+
         mission_space = MissionSpace(mission_func=self._gen_mission)
         super().__init__(
             mission_space=mission_space,
@@ -44,21 +50,34 @@ class CountingEnv(MiniGridEnv):
     def _gen_mission():
         return 'Pass through the green door if the number of previously seen items matching the color of the object in the room is even. If not, choose the red door.'
     
+    def _rand_object_index(self):
+        # Same draws as _rand_elem([Ball, Key, Box]) followed by _rand_elem(COLOR_NAMES)
+        object = self._rand_int(0, 3)
+        return object * len(COLOR_NAMES) + self._rand_int(0, len(COLOR_NAMES))
+
+    def _set_cell(self, x, y, obj):
+        self.grid.set(x, y, obj)
+        self.occupied_cells.append((x, y))
+
+    def _place_door(self, x, color):
+        door = self.doors[color]
+        door.is_open = False
+        self._set_cell(x, 0, door)
+
     def _gen_normal_room(self):
         # Fix the player's start position and orientation
         self.agent_pos = np.array((2, 3))
         self.agent_dir = 3 # facing up
 
         # Place door
-        self.grid.set(2, 0, Door('blue'))
+        self._place_door(2, 'blue')
 
         # generate objects
         for x, y in [(1, 1), (3, 1), (1, 2), (3, 2), (1, 3), (3, 3)]:
-            object = self._rand_elem([Ball, Key, Box])
-            color = self._rand_elem(COLOR_NAMES)
+            index = self._rand_object_index()
             if self._rand_float(0, 1) > self.empty_freq: 
-                self.grid.set(x, y, object(color))
-                self.object_count[(object, color)] += 1
+                self._set_cell(x, y, self.objects[index])
+                self.object_count[index] += 1
     
     def _gen_test_room(self):
         # Fix the player's start position and orientation
@@ -66,37 +85,35 @@ class CountingEnv(MiniGridEnv):
         self.agent_dir = 3 # facing up
 
         # Place doors
-        self.grid.set(1, 0, Door('green'))
-        self.grid.set(3, 0, Door('red'))
+        self._place_door(1, 'green')
+        self._place_door(3, 'red')
 
         # generate object
-        object = self._rand_elem([Ball, Key, Box])
-        color = self._rand_elem(COLOR_NAMES)
-        self.grid.set(2, 1, object(color))
-        self.correct_door = (1, 0) if self.object_count[(object, color)] % 2 == 0 else (3, 0)
+        index = self._rand_object_index()
+        self._set_cell(2, 1, self.objects[index])
+        self.correct_door = (1, 0) if self.object_count[index] % 2 == 0 else (3, 0)
 
     def _clear_room(self):
-        # clear room
-        for i in range(1, 4):
-            for j in range(1, 4):
-                self.grid.set(i, j, None)
-        # clear doors
-        self.grid.horz_wall(0, 0)
+        # clear the objects and put walls back in place of the doors
+        for x, y in self.occupied_cells:
+            self.grid.set(x, y, self.wall if y == 0 else None)
+        self.occupied_cells = []
 
     def _gen_grid(self, width, height):
         self.mission = 'Pass through the green door if the number of previously seen items matching the color of the object in the room is even. If not, choose the red door.'
-        self.grid = Grid(width, height)
+        self.grid = self._new_grid(width, height)
+        self.occupied_cells = []
 
         # Generate the surrounding walls
-        self.grid.horz_wall(0, 0)
-        self.grid.horz_wall(0, height - 1)
-        self.grid.vert_wall(0, 0)
-        self.grid.vert_wall(width - 1, 0)
+        self.grid.horz_wall(0, 0, obj_type=lambda: self.wall)
+        self.grid.horz_wall(0, height - 1, obj_type=lambda: self.wall)
+        self.grid.vert_wall(0, 0, obj_type=lambda: self.wall)
+        self.grid.vert_wall(width - 1, 0, obj_type=lambda: self.wall)
 
         self._gen_normal_room()
 
     def reset(self, **kwargs):
-        self.object_count = defaultdict(int)
+        self.object_count = [0] * len(self.objects)
         self.rooms_visited = 1
         return super().reset(**kwargs)
 
@@ -104,8 +121,12 @@ class CountingEnv(MiniGridEnv):
         if action == Actions.pickup: # Don't allow picking up objects
             action = Actions.toggle
 
-        obs, reward, terminated, truncated, info = super().step(action)
+        # the room may change after moving, so the observation is only generated once the room is final
+        _, reward, terminated, truncated, info = self._step_without_obs(action)
+        reward, terminated, info = self._update_room(reward, terminated, truncated, info)
+        return self.gen_obs(), reward, terminated, truncated, info
 
+    def _update_room(self, reward, terminated, truncated, info):
         if self.agent_pos[1] == 0: # reached a door
             # verify the results of a test room
             if self.agent_pos != (2, 0): # previous room was a test room
@@ -113,13 +134,13 @@ class CountingEnv(MiniGridEnv):
                     reward = 0
                     info['success'] = False
                     terminated = True
-                    return obs, reward, terminated, truncated, info
+                    return reward, terminated, info
                 
             if self.rooms_visited == self.length: # visited all the rooms
                 terminated = True
                 reward = 1
                 info['success'] = True
-                return obs, reward, terminated, truncated, info
+                return reward, terminated, info
 
             # Generate a new room
             self._clear_room()
@@ -134,15 +155,13 @@ class CountingEnv(MiniGridEnv):
             reward = 1 if self.rooms_visited == self.length else 0
             info['success'] = True if self.rooms_visited == self.length else False
             
-        return self.gen_obs(), reward, terminated, truncated, info
-    
-    def get_obs_render(self):
-        return self.get_pov_render(tile_size=self.tile_size)
+        return reward, terminated, info
     
 def main():
     env = CountingEnv(length=10, tile_size=TILE_PIXELS, screen_size=800, render_mode="human")
 
-    # enable manual control for testing
+    # enable manual control for testing, imported here so that only the play entry points load it
+    from minigrid.manual_control import ManualControl
     manual_control = ManualControl(env)
     manual_control.start()
 
@@ -1,32 +1,54 @@
 from __future__ import annotations
 
+import functools
+
 import numpy as np
 
 from minigrid.core.actions import Actions
 from minigrid.core.constants import COLOR_NAMES, TILE_PIXELS
 from minigrid.core.grid import Grid
 from minigrid.core.mission import MissionSpace
-from minigrid.core.world_object import Ball, Key, Wall, Door, Box
-from minigrid.manual_control import ManualControl
-from minigrid.minigrid_env import MiniGridEnv
+from minigrid.core.world_object import Ball, Key, Wall, Door, Box, WorldObj
+from ltmb.envs.base import EncodedGrid, LTMBEnv
+from ltmb.envs.view import EMPTY, PAD, WALL, gen_image
+
+class HallwayEnv(LTMBEnv):
+    """Find the hallway that holds the object shown in the start room.
+
+    The grid is (4 * length + 5) cells wide and high. With lazy_grid=True it is a LazyHallwayGrid, which
+    only encodes the cells around the agent, so that memory stays flat for thousands of hallways.
+    Episodes are the same as with the full grid, but rendering the whole grid still encodes every cell.
+    """
+
+    # Static wall layouts, shared by all envs of the same size
+    layouts = {}
 
-class HallwayEnv(MiniGridEnv):
-    def __init__(self, length=5, max_steps=16, tile_size=12, screen_size=640, **kwargs):
+    def __init__(self, length=5, max_steps=16, tile_size=12, screen_size=640, lazy_grid=False, **kwargs):
         self.length = length # number of vertical hallways
         self.size = 4 * length + 5
+        self.lazy_grid = lazy_grid
         max_steps = max(max_steps, self.size + 20)
 
+        # Only the doors' colors and the objects change between episodes, so the doors are recolored on
+        # reset and objects come from a cache of one instance per (object, color) pair. A lazy grid
+        # copies the encoding of the doors it is given, so one door is enough.
+        self.doors = [Door('red') for _ in range(1 if lazy_grid else 2 * length)]
+        self.objects = {(obj, color): obj(color) for obj in [Ball, Key, Box] for color in COLOR_NAMES}
+
         mission_space = MissionSpace(mission_func=self._gen_mission)
+        # MiniGridEnv allocates a full Grid on construction, so a lazy env is constructed with a small one
+        size = 3 if lazy_grid else self.size
         super().__init__(
             mission_space=mission_space,
-            width=self.size,
-            height=self.size,
+            width=size,
+            height=size,
             see_through_walls=True,
             max_steps=max_steps,
             screen_size=screen_size,
             tile_size=tile_size,
             **kwargs,
         )
+        self.width = self.height = self.size
 
     @staticmethod
     def _gen_mission():
@@ -40,21 +62,26 @@ class HallwayEnv(MiniGridEnv):
         if obj == self.target_obj and color == self.target_color: 
             new_colors = [c for c in COLOR_NAMES if c != self.target_color]
             color = self._rand_elem(new_colors)
-        return obj(color)
+        return self.objects[(obj, color)]
 
-    def _gen_grid(self, width, height):
-        self.mission = 'Enter the hallway that features an identical object to the one found in the start room.'
-        self.grid = Grid(width, height)
+    def _door(self, index):
+        door = self.doors[index % len(self.doors)]
+        door.color = self._rand_elem(COLOR_NAMES)
+        door.is_open = False
+        return door
 
-        # choose the target object and color
-        self.target_color = self._rand_elem(COLOR_NAMES)
-        self.target_obj = self._rand_elem([Key, Ball, Box])
+    @staticmethod
+    def _gen_layout(width, height):
+        """Grid cells of the walls and their encoding, which only depend on the size of the grid"""
+        grid = EncodedGrid(width, height)
+        wall = Wall()
+        obj_type = lambda: wall
 
         # Generate the surrounding walls
-        self.grid.horz_wall(0, 0)
-        self.grid.horz_wall(0, height - 1)
-        self.grid.vert_wall(0, 0)
-        self.grid.vert_wall(width - 1, 0)
+        grid.horz_wall(0, 0, obj_type=obj_type)
+        grid.horz_wall(0, height - 1, obj_type=obj_type)
+        grid.vert_wall(0, 0, obj_type=obj_type)
+        grid.vert_wall(width - 1, 0, obj_type=obj_type)
 
         assert height % 2 == 1
         upper_room_wall = height // 2 - 2
@@ -62,30 +89,54 @@ class HallwayEnv(MiniGridEnv):
 
         # Start room
         for i in range(1, 5):
-            self.grid.set(i, upper_room_wall, Wall())
-            self.grid.set(i, lower_room_wall, Wall())
-        self.grid.set(4, upper_room_wall + 1, Wall())
-        self.grid.set(4, lower_room_wall - 1, Wall())
+            grid.set(i, upper_room_wall, wall)
+            grid.set(i, lower_room_wall, wall)
+        grid.set(4, upper_room_wall + 1, wall)
+        grid.set(4, lower_room_wall - 1, wall)
 
         # Horizontal hallway
         for i in range(5, width - 2):
-            self.grid.set(i, upper_room_wall + 1, Wall())
-            self.grid.set(i, lower_room_wall - 1, Wall())
+            grid.set(i, upper_room_wall + 1, wall)
+            grid.set(i, lower_room_wall - 1, wall)
 
         # Vertical hallways
         for i in range(6, width - 2, 4):
-            # set walls
             for j in range(2):
-                self.grid.set(i, upper_room_wall - j, Wall()) # upper left wall
-                self.grid.set(i + 2, upper_room_wall - j, Wall()) # upper right wall
-                self.grid.set(i, lower_room_wall + j, Wall()) # lower left wall
-                self.grid.set(i + 2, lower_room_wall + j, Wall()) # lower right wall
-            self.grid.set(i + 1, upper_room_wall - 1, Wall())
-            self.grid.set(i + 1, lower_room_wall + 1, Wall())
-            
+                grid.set(i, upper_room_wall - j, wall) # upper left wall
+                grid.set(i + 2, upper_room_wall - j, wall) # upper right wall
+                grid.set(i, lower_room_wall + j, wall) # lower left wall
+                grid.set(i + 2, lower_room_wall + j, wall) # lower right wall
+            grid.set(i + 1, upper_room_wall - 1, wall)
+            grid.set(i + 1, lower_room_wall + 1, wall)
+
+        return grid.grid, grid.encoding
+
+    def _new_grid(self, width, height):
+        return LazyHallwayGrid(width, height) if self.lazy_grid else super()._new_grid(width, height)
+
+    def _gen_grid(self, width, height):
+        self.mission = 'Enter the hallway that features an identical object to the one found in the start room.'
+        self.grid = self._new_grid(width, height)
+        if not self.lazy_grid:
+            if (width, height) not in HallwayEnv.layouts:
+                HallwayEnv.layouts[(width, height)] = self._gen_layout(width, height)
+            cells, encoding = HallwayEnv.layouts[(width, height)]
+            self.grid.grid[:] = cells
+            if self.fast_obs:
+                self.grid.encoding[:] = encoding
+
+        # choose the target object and color
+        self.target_color = self._rand_elem(COLOR_NAMES)
+        self.target_obj = self._rand_elem([Key, Ball, Box])
+
+        upper_room_wall = height // 2 - 2
+        lower_room_wall = height // 2 + 2
+
+        # Vertical hallways
+        for k, i in enumerate(range(6, width - 2, 4)):
             # set doors
-            self.grid.set(i + 1, upper_room_wall + 1, Door(self._rand_elem(COLOR_NAMES)))
-            self.grid.set(i + 1, lower_room_wall - 1, Door(self._rand_elem(COLOR_NAMES)))
+            self.grid.set(i + 1, upper_room_wall + 1, self._door(2 * k))
+            self.grid.set(i + 1, lower_room_wall - 1, self._door(2 * k + 1))
 
             # set objects
             self.grid.set(i + 1, upper_room_wall, self._rand_obj())
@@ -96,7 +147,8 @@ class HallwayEnv(MiniGridEnv):
         self.agent_dir = 0
 
         # Place target object in the start room
-        self.grid.set(1, height // 2 - 1, self.target_obj(self.target_color))
+        target = self.objects[(self.target_obj, self.target_color)]
+        self.grid.set(1, height // 2 - 1, target)
 
         # Choose the target hallway and place the target object there
         self.target_hallway = self._rand_int(0, self.length)
@@ -106,7 +158,7 @@ class HallwayEnv(MiniGridEnv):
         else: # Place the target object in the lower hallway
             self.target_pos = (7 + 4 * self.target_hallway, lower_room_wall)
             self.success_pos = (7 + 4 * self.target_hallway , lower_room_wall - 1)
-        self.grid.set(*self.target_pos, self.target_obj(self.target_color))
+        self.grid.set(*self.target_pos, target)
 
     def step(self, action):
         if action == Actions.pickup: # Don't allow picking up objects
@@ -124,14 +176,165 @@ class HallwayEnv(MiniGridEnv):
             terminated = True
      
         return obs, reward, terminated, truncated, info
-    
-    def get_obs_render(self):
-        return self.get_pov_render(tile_size=self.tile_size)
-    
+
+@functools.lru_cache(maxsize=None)
+def _column_bands():
+    # Past the start room the walls repeat every 4 columns, so every column of a layout has the same band
+    # of rows around the horizontal hallway as one of the columns of the layout for length 2
+    size = 4 * 2 + 5
+    _, encoding = HallwayEnv._gen_layout(size, size)
+    return encoding[PAD:PAD + size, PAD + size // 2 - 3:PAD + size // 2 + 4].copy()
+
+class LazyHallwayGrid:
+    """Grid of a HallwayEnv that is encoded around the agent only, as the agent moves.
+
+    The walls are generated from the layout of a short hallway, and the doors and objects of the vertical
+    hallways are held as arrays of their encodings, which are set in the same order and from the same random
+    draws as the cells of a full grid. The encoding covers a window of SPAN columns around the agent (plus
+    the cells in view) and is regenerated when the agent leaves it. Doors become Door objects while they
+    are in the window, so that they can be toggled, and are written back to their encodings when it moves on.
+
+    Cells can be read and set like the cells of a Grid. encode() encodes the whole grid.
+    """
+
+    SPAN = 32
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.mid = height // 2
+        self.length = (width - 5) // 4
+        self.wall = Wall()
+        self.door_encoding = np.zeros((2 * self.length, 3), dtype=np.uint8) # upper and lower door of each hallway
+        self.object_encoding = np.zeros((2 * self.length, 3), dtype=np.uint8) # upper and lower object of each hallway
+        self.objects = {} # encoding -> object, of the objects that were set
+        self.overrides = {} # (i, j) -> object, of the other cells that were set
+        self.doors = {} # index -> Door, of the doors in the window
+        self.origin = None # first column of the window
+        self.encoding = None
+
+    def _hallway_cell(self, i, j):
+        # Array and index of the door or object at (i, j), if it is a door or object cell of a vertical hallway
+        k, r = divmod(i - 7, 4)
+        dy = j - self.mid
+        if r != 0 or not 0 <= k < self.length or abs(dy) not in (1, 2):
+            return None, None
+        return (self.door_encoding if abs(dy) == 1 else self.object_encoding), 2 * k + (dy > 0)
+
+    def _door(self, index):
+        door = self.doors.get(index)
+        if door is None:
+            if len(self.doors) >= self.SPAN:
+                # Without a window (fast_obs=False) doors are only dropped here
+                column = 7 + 4 * (index // 2)
+                self._drop_doors(column - self.SPAN // 2, column + self.SPAN // 2)
+            door = self.doors[index] = WorldObj.decode(*self.door_encoding[index].tolist())
+        return door
+
+    def _sync_doors(self):
+        # Doors are toggled in place, so their state is read back before they are encoded
+        for index, door in self.doors.items():
+            self.door_encoding[index] = door.encode()
+
+    def _drop_doors(self, x0, x1):
+        # Doors outside of columns [x0, x1) are written back to their encodings and dropped
+        self._sync_doors()
+        self.doors = {index: door for index, door in self.doors.items() if x0 <= 7 + 4 * (index // 2) < x1}
+
+    def get(self, i, j):
+        assert 0 <= i < self.width
+        assert 0 <= j < self.height
+        if (i, j) in self.overrides:
+            return self.overrides[(i, j)]
+        array, index = self._hallway_cell(i, j)
+        if array is self.door_encoding:
+            return self._door(index)
+        if array is self.object_encoding:
+            return self.objects[tuple(array[index].tolist())]
+        if i in (0, self.width - 1) or j in (0, self.height - 1):
+            return self.wall
+        if abs(j - self.mid) > 3:
+            return None
+        column = i if i < 6 else 6 + (i - 6) % 4
+        return self.wall if _column_bands()[column, j - self.mid + 3, 0] == WALL[0] else None
+
+    def set(self, i, j, v):
+        array, index = self._hallway_cell(i, j)
+        if v is not None and array is (self.door_encoding if v.type == 'door' else self.object_encoding):
+            encoding = v.encode()
+            array[index] = encoding
+            if array is self.door_encoding:
+                self.doors.pop(index, None)
+            else:
+                self.objects.setdefault(encoding, v)
+            self.overrides.pop((i, j), None)
+        else:
+            self.overrides[(i, j)] = v
+        self.refresh(i, j)
+
+    def refresh(self, i, j):
+        if self.encoding is None:
+            return
+        x, y = i - self.origin + PAD, j - (self.mid - 3) + PAD
+        if 0 <= x < self.encoding.shape[0] and 0 <= y < self.encoding.shape[1]:
+            v = self.get(i, j)
+            self.encoding[x, y] = EMPTY if v is None else v.encode()
+
+    def _encode(self, x0, x1, y0, y1):
+        """Encoding of the cells in [x0, x1) x [y0, y1), where cells outside of the grid are walls."""
+        self._sync_doors()
+        bands = _column_bands()
+        xs, ys = np.arange(x0, x1), np.arange(y0, y1)
+        out = np.empty((len(xs), len(ys), 3), dtype=np.uint8)
+        out[...] = EMPTY
+
+        inside = (xs >= 0) & (xs < self.width)
+        columns = np.where(xs < 6, xs, 6 + (xs - 6) % 4)
+        band = np.abs(ys - self.mid) <= 3
+        out[np.ix_(inside, band)] = bands[columns[inside]][:, ys[band] - self.mid + 3]
+        out[(xs == 0) | (xs == self.width - 1)] = WALL
+        out[:, (ys == 0) | (ys == self.height - 1)] = WALL
+        out[~inside] = WALL
+        out[:, (ys < 0) | (ys >= self.height)] = WALL
+
+        # Doors and objects of the vertical hallways in range
+        hallways = (xs - 7) // 4
+        hallways = hallways[((xs - 7) % 4 == 0) & (hallways >= 0) & (hallways < self.length)]
+        for dy, array in ((-2, self.object_encoding), (-1, self.door_encoding), (1, self.door_encoding), (2, self.object_encoding)):
+            if y0 <= self.mid + dy < y1:
+                out[7 + 4 * hallways - x0, self.mid + dy - y0] = array[2 * hallways + (dy > 0)]
+
+        for (i, j), v in self.overrides.items():
+            if x0 <= i < x1 and y0 <= j < y1:
+                out[i - x0, j - y0] = EMPTY if v is None else v.encode()
+        return out
+
+    def _move_window(self, x):
+        self.origin = x - self.SPAN // 2
+        # The agent never leaves the 7 rows of the hallways, so the window only covers them and the cells in view
+        self.encoding = self._encode(self.origin - PAD, self.origin + self.SPAN + PAD, self.mid - 3 - PAD, self.mid + 4 + PAD)
+        self._drop_doors(self.origin - PAD, self.origin + self.SPAN + PAD)
+
+    def gen_image(self, agent_pos, agent_dir, out=None):
+        """Image observation of the agent at agent_pos facing agent_dir (see ltmb.envs.view.gen_image)."""
+        x, y = agent_pos
+        if self.encoding is None or not self.origin <= x < self.origin + self.SPAN:
+            self._move_window(x)
+        return gen_image(self.encoding, (x - self.origin, y - (self.mid - 3)), agent_dir, out)
+
+    def encode(self, vis_mask=None):
+        encoding = self._encode(0, self.width, 0, self.height)
+        if vis_mask is not None:
+            encoding[~vis_mask] = 0
+        return encoding
+
+    slice = Grid.slice
+
 def main():
     env = HallwayEnv(length=5, tile_size=TILE_PIXELS, screen_size=800, render_mode="human")
 
-    # enable manual control for testing
+    # enable manual control for testing, imported here so that only the play entry points load it
+    from minigrid.manual_control import ManualControl
     manual_control = ManualControl(env)
     manual_control.start()
 
@@ -2,23 +2,23 @@ from __future__ import annotations
 
 import numpy as np
 import itertools
-import random
 
 from minigrid.core.actions import Actions
 from minigrid.core.constants import COLOR_NAMES, TILE_PIXELS
-from minigrid.core.grid import Grid
 from minigrid.core.mission import MissionSpace
 from minigrid.core.world_object import Ball, Key, Box
-from minigrid.manual_control import ManualControl
-from minigrid.minigrid_env import MiniGridEnv
+from ltmb.envs.base import LTMBEnv
+
+class OrderingEnv(LTMBEnv):
+    PROFILED = LTMBEnv.PROFILED + ('_gen_new_room',)
+    OBJECTS = tuple(itertools.product([Ball, Key, Box], COLOR_NAMES)) # every (object, color) pair, in a fixed order
 
-class OrderingEnv(MiniGridEnv):
     def __init__(self, length=5, tile_size=12, screen_size=640, **kwargs):
         self.length = length # number of commands
         max_steps = 18 + length
         self.tile_size = tile_size # size of tiles in pixels
-        random.seed(int(self._rand_int(0, 10**9)))
-        self.permutation = list(itertools.product([Ball, Key, Box], COLOR_NAMES))
+        self.permutation = list(self.OBJECTS)
+        self.rank = {} # maps (object, color) to its position in the permutation
         self.timestep = 0
         self.choices = []
         
@@ -45,20 +45,23 @@ class OrderingEnv(MiniGridEnv):
             self.grid.set(3, 3, object(color))
         else:
             self.grid.set(3, 3, None)
-            self.choices = random.sample(self.permutation, 2)
+            self.choices = self._rand_subset(self.permutation, 2)
             self.grid.set(2, 3, self.choices[0][0](self.choices[0][1]))
             self.grid.set(4, 3, self.choices[1][0](self.choices[1][1]))
 
     def _gen_grid(self, width, height):
         self.mission = 'Memorize the sequence of the first 18 colored objects presented. When given a choice between two objects, select the one that appeared earlier in the sequence.'
-        self.grid = Grid(width, height)
+        self.grid = self._new_grid(width, height)
 
         # Fix the player's start position and orientation
         self.agent_pos = np.array((3, 6))
         self.agent_dir = 3 # facing up
 
-        # generate a permutation of all possible objects and colors
-        random.shuffle(self.permutation)
+        # generate a permutation of all possible objects and colors, drawn only from this env's np_random
+        # so that the episode is determined by the seed passed to reset
+        self.permutation = list(self.OBJECTS)
+        self.np_random.shuffle(self.permutation)
+        self.rank = {obj_color: i for i, obj_color in enumerate(self.permutation)}
 
         self.timestep = 0
         self._gen_new_room()
@@ -69,7 +72,7 @@ class OrderingEnv(MiniGridEnv):
     def step(self, action):
         incorrect_action = False
         if self.timestep >= 18:
-            correct_action = Actions.left if self.permutation.index(self.choices[0]) < self.permutation.index(self.choices[1]) else Actions.right
+            correct_action = Actions.left if self.rank[self.choices[0]] < self.rank[self.choices[1]] else Actions.right
             incorrect_action = action != correct_action
 
         # generate a new room
@@ -91,13 +94,11 @@ class OrderingEnv(MiniGridEnv):
      
         return obs, reward, terminated, truncated, info
     
-    def get_obs_render(self):
-        return self.get_pov_render(tile_size=self.tile_size)
-    
 def main():
     env = OrderingEnv(length=10, tile_size=TILE_PIXELS, screen_size=1300, render_mode="human")
 
-    # enable manual control for testing
+    # enable manual control for testing, imported here so that only the play entry points load it
+    from minigrid.manual_control import ManualControl
     manual_control = ManualControl(env)
     manual_control.start()
 
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import functools
+
+import numpy as np
+
+from minigrid.core.constants import COLOR_TO_IDX, OBJECT_TO_IDX, TILE_PIXELS
+from minigrid.core.grid import Grid
+from minigrid.core.world_object import WorldObj
+from ltmb.envs.view import AGENT_VIEW_SIZE, PAD, VIEW_OFFSETS
+
+# Frames are assembled from a tile atlas: every tile that Grid.render_tile can draw is given an integer key,
+# built from the encoded cell, whether the agent stands on it (and facing which way) and whether it is
+# highlighted. A frame is then a single gather of tiles from the atlas by the keys of its cells, which
+# produces the same pixels as MiniGridEnv.get_full_render and get_pov_render without a Python loop per cell.
+NUM_OBJECTS = len(OBJECT_TO_IDX)
+NUM_COLORS = len(COLOR_TO_IDX)
+NUM_STATES = 3
+NUM_AGENT_VARIANTS = 5 # no agent, or the agent facing one of the 4 directions
+NUM_KEYS = NUM_OBJECTS * NUM_COLORS * NUM_STATES * NUM_AGENT_VARIANTS * 2
+UNSEEN = OBJECT_TO_IDX['unseen']
+POV_AGENT = (AGENT_VIEW_SIZE // 2, AGENT_VIEW_SIZE - 1) # the agent is drawn at the bottom center of its view, facing up
+POV_DIR = 3
+
+class TileAtlas:
+    """Rendered tiles of one tile_size, indexed by tile key. Tiles are rendered the first time they are gathered."""
+
+    def __init__(self, tile_size):
+        self.tile_size = tile_size
+        self.tiles = np.zeros((NUM_KEYS, tile_size, tile_size, 3), dtype=np.uint8)
+        self.rendered = np.zeros(NUM_KEYS, dtype=bool)
+
+    def _render(self, key):
+        # Inverse of tile_keys
+        rest, highlight = divmod(int(key), 2)
+        rest, agent = divmod(rest, NUM_AGENT_VARIANTS)
+        rest, state = divmod(rest, NUM_STATES)
+        obj_type, color = divmod(rest, NUM_COLORS)
+        self.tiles[key] = Grid.render_tile(
+            WorldObj.decode(obj_type, color, state),
+            agent_dir=agent - 1 if agent else None,
+            highlight=bool(highlight),
+            tile_size=self.tile_size,
+        )
+        self.rendered[key] = True
+
+    def fill(self, keys):
+        """Render the tiles of keys that have not been rendered yet."""
+        missing = keys[~self.rendered[keys]]
+        for key in np.unique(missing):
+            self._render(key)
+
+    def rows(self):
+        """The tiles as one row of pixels per (key, y), indexed by key * tile_size + y."""
+        return self.tiles.reshape(NUM_KEYS * self.tile_size, self.tile_size * 3)
+
+@functools.lru_cache(maxsize=None)
+def tile_atlas(tile_size=TILE_PIXELS):
+    """The shared TileAtlas of a tile size."""
+    return TileAtlas(tile_size)
+
+def tile_keys(encoding, agent=None, highlight=None):
+    """Tile keys of an encoded grid of shape (..., W, H, 3).
+
+    agent holds 0 for cells without the agent and agent_dir + 1 where it stands, highlight is a boolean mask.
+    """
+    encoding = encoding.astype(np.int32)
+    keys = (encoding[..., 0] * NUM_COLORS + encoding[..., 1]) * NUM_STATES + encoding[..., 2]
+    keys *= NUM_AGENT_VARIANTS
+    if agent is not None:
+        keys += agent
+    keys *= 2
+    if highlight is not None:
+        keys += highlight
+    return keys
+
+def render_keys(keys, tile_size=TILE_PIXELS, out=None):
+    """Render frames of shape (..., H * tile_size, W * tile_size, 3) from tile keys of shape (..., W, H)."""
+    width, height = keys.shape[-2:]
+    batch_shape = keys.shape[:-2]
+    if out is None:
+        out = np.empty(batch_shape + (height * tile_size, width * tile_size, 3), dtype=np.uint8)
+    elif not out.flags.c_contiguous:
+        raise ValueError('out must be C-contiguous')
+    atlas = tile_atlas(tile_size)
+    atlas.fill(keys)
+    # Pixel row y of tile (i, j) is frame row j * tile_size + y at columns i * tile_size:. Gathering whole
+    # tile rows in (j, y, i) order writes the frame contiguously, which is much faster than copying tiles.
+    rows = keys.swapaxes(-1, -2)[..., :, None, :] * tile_size + np.arange(tile_size)[:, None] # (..., H, tile_size, W)
+    np.take(atlas.rows(), rows, axis=0, out=out.reshape(rows.shape + (tile_size * 3,)), mode='clip') # clip does not buffer out
+    return out
+
+def render_pov(images, tile_size=TILE_PIXELS, out=None):
+    """Render image observations of shape (..., 7, 7, 3) as the agent's point of view.
+
+    Matches MiniGridEnv.get_pov_render of the LTMB envs and the rendering of Grid.decode(image), where
+    every seen cell is highlighted.
+    """
+    agent = np.zeros(images.shape[-3:-1], dtype=np.int32)
+    agent[POV_AGENT] = POV_DIR + 1
+    keys = tile_keys(images, agent, images[..., 0] != UNSEEN)
+    return render_keys(keys, tile_size, out)
+
+def render_top_down(encodings, agent_pos, agent_dir, tile_size=TILE_PIXELS, highlight=True, out=None):
+    """Render encoded grids of shape (B, W, H, 3) with agents at agent_pos (B, 2) facing agent_dir (B,).
+
+    Matches MiniGridEnv.get_full_render of the LTMB envs, which highlights the agent's view when highlight is set.
+    """
+    num_frames, width, height = encodings.shape[:3]
+    agent_pos = np.asarray(agent_pos, dtype=np.int64).reshape(num_frames, 2)
+    agent_dir = np.asarray(agent_dir, dtype=np.int64).reshape(num_frames)
+    batch = np.arange(num_frames)
+
+    agent = np.zeros((num_frames, width, height), dtype=np.int32)
+    agent[batch, agent_pos[:, 0], agent_pos[:, 1]] = agent_dir + 1
+    mask = None
+    if highlight:
+        # Mark the cells in view on a padded mask so that the view never has to be clipped
+        mask = np.zeros((num_frames, width + 2 * PAD, height + 2 * PAD), dtype=bool)
+        offsets = VIEW_OFFSETS[agent_dir]
+        mask[batch[:, None, None], offsets[..., 0] + (agent_pos[:, 0, None, None] + PAD), offsets[..., 1] + (agent_pos[:, 1, None, None] + PAD)] = True
+        mask = mask[:, PAD:PAD + width, PAD:PAD + height]
+    return render_keys(tile_keys(encodings, agent, mask), tile_size, out)
+
+def write_video(path, frames, fps=10):
+    """Encode an iterable of frames (or batches of frames) to a video file with imageio."""
+    try:
+        import imageio.v2 as imageio
+    except ImportError as e:
+        raise ImportError('write_video requires imageio and imageio-ffmpeg') from e
+
+    with imageio.get_writer(path, fps=fps, macro_block_size=1) as writer:
+        for frame in frames:
+            if frame.ndim == 4:
+                for f in frame:
+                    writer.append_data(f)
+            else:
+                writer.append_data(frame)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import numpy as np
+
+from minigrid.core.constants import COLOR_TO_IDX, DIR_TO_VEC, OBJECT_TO_IDX
+
+# Integer encodings of the tiles that MiniGridEnv.gen_obs produces outside of the grid itself
+AGENT_VIEW_SIZE = 7
+EMPTY = (OBJECT_TO_IDX['empty'], 0, 0)
+WALL = (OBJECT_TO_IDX['wall'], COLOR_TO_IDX['grey'], 0) # cells outside of the grid are seen as grey walls
+
+# Grids are padded with walls on every side so that the agent's view never has to be clipped
+PAD = AGENT_VIEW_SIZE - 1
+
+def _view_offsets():
+    # View cell (i, j) sees the world cell agent_pos + forward * (size - 1 - j) + right * (i - size // 2),
+    # which is the slice + rotate_left sequence of MiniGridEnv.gen_obs_grid written as a lookup table
+    offsets = np.zeros((4, AGENT_VIEW_SIZE, AGENT_VIEW_SIZE, 2), dtype=np.int64)
+    i, j = np.meshgrid(np.arange(AGENT_VIEW_SIZE), np.arange(AGENT_VIEW_SIZE), indexing='ij')
+    for agent_dir, (dx, dy) in enumerate(DIR_TO_VEC):
+        rx, ry = -dy, dx
+        offsets[agent_dir, :, :, 0] = dx * (AGENT_VIEW_SIZE - 1 - j) + rx * (i - AGENT_VIEW_SIZE // 2)
+        offsets[agent_dir, :, :, 1] = dy * (AGENT_VIEW_SIZE - 1 - j) + ry * (i - AGENT_VIEW_SIZE // 2)
+    return offsets
+
+VIEW_OFFSETS = _view_offsets()
+
+def padded_encoding(width, height, batch_shape=()):
+    """Allocate an encoded grid of empty cells surrounded by PAD cells of walls."""
+    encoding = np.empty(batch_shape + (width + 2 * PAD, height + 2 * PAD, 3), dtype=np.uint8)
+    encoding[...] = WALL
+    encoding[..., PAD:PAD + width, PAD:PAD + height, :] = EMPTY
+    return encoding
+
+def gen_image(encoding, agent_pos, agent_dir, out=None):
+    """Egocentric image observation of a padded encoded grid.
+
+    Matches MiniGridEnv.gen_obs()['image'] for envs with see_through_walls=True and nothing carried.
+    """
+    offsets = VIEW_OFFSETS[agent_dir]
+    xs = offsets[:, :, 0] + (agent_pos[0] + PAD)
+    ys = offsets[:, :, 1] + (agent_pos[1] + PAD)
+    if out is None:
+        out = np.empty((AGENT_VIEW_SIZE, AGENT_VIEW_SIZE, 3), dtype=np.uint8)
+    out[...] = encoding[xs, ys]
+    out[AGENT_VIEW_SIZE // 2, AGENT_VIEW_SIZE - 1] = EMPTY # the agent does not see itself
+    return out
+
+def gen_images(encodings, agent_pos, agent_dir, out=None):
+    """Batched gen_image over encodings of shape (B, W + 2 * PAD, H + 2 * PAD, 3)."""
+    offsets = VIEW_OFFSETS[agent_dir] # (B, 7, 7, 2)
+    xs = offsets[..., 0] + (agent_pos[:, 0, None, None] + PAD)
+    ys = offsets[..., 1] + (agent_pos[:, 1, None, None] + PAD)
+    batch = np.arange(len(encodings))[:, None, None]
+    if out is None:
+        out = np.empty((len(encodings), AGENT_VIEW_SIZE, AGENT_VIEW_SIZE, 3), dtype=np.uint8)
+    out[...] = encodings[batch, xs, ys]
+    out[:, AGENT_VIEW_SIZE // 2, AGENT_VIEW_SIZE - 1] = EMPTY
+    return out
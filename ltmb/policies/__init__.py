@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from ltmb.policies.policy import Policy
+from ltmb.policies.policy import Policy, ExpertPolicy
 from ltmb.policies.random_policy import RandomPolicy
 from ltmb.policies.expert_hallway_policy import ExpertHallwayPolicy
 from ltmb.policies.expert_ordering_policy import ExpertOrderingPolicy
-from ltmb.policies.expert_counting_policy import ExpertCountingPolicy
\ No newline at end of file
+from ltmb.policies.expert_counting_policy import ExpertCountingPolicy
+from ltmb.policies.batched_expert_policies import BatchedPolicy, BatchedExpertHallwayPolicy, BatchedExpertOrderingPolicy, BatchedExpertCountingPolicy
\ No newline at end of file
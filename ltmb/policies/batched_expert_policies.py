@@ -0,0 +1,192 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from minigrid.core.actions import Actions
+from ltmb.policies.codes import OBJECT_IDX, COLOR_IDX, EMPTY, DOOR, KEY, BALL, BOX, NUM_KEYS, pack_key
+
+def _pack(tiles):
+    # Packed (object, color) keys of an array of encoded tiles
+    return pack_key(tiles[..., OBJECT_IDX].astype(np.int64), tiles[..., COLOR_IDX])
+
+class BatchedPolicy(ABC):
+    """Expert policy acting on a batch of num_envs episodes at once.
+
+    select_actions takes an observation dict (or image array) of shape (B, 7, 7, 3) and returns the B
+    actions together with the memory associations added at this step, as rows of
+    (env index, query token, key token) in the order the single-episode expert would append them.
+    Per-episode state is kept in arrays; call reset(indices) whenever those episodes are reset.
+    """
+
+    def __init__(self, num_envs):
+        self.num_envs = num_envs
+        self.timestep = np.zeros(num_envs, dtype=np.int64)
+        self._batch = np.arange(num_envs)
+
+    def reset(self, indices=None):
+        indices = self._batch if indices is None else np.asarray(indices)
+        self.timestep[indices] = 0
+
+    @abstractmethod
+    def select_actions(self, obs):
+        pass
+
+    def _current_associations(self):
+        # every observation attends to itself; observations are at even and actions at odd token indices
+        return np.stack([self._batch, 2 * self.timestep, 2 * self.timestep], axis=1)
+
+    @staticmethod
+    def _merge(associations):
+        # Group the associations by episode while keeping the per-episode order
+        associations = np.concatenate(associations)
+        return associations[np.argsort(associations[:, 0], kind='stable')]
+
+class _ActionPlans:
+    """Scripted action sequences, one per episode, stored as a padded array with a cursor."""
+
+    def __init__(self, num_envs, max_len):
+        self.actions = np.zeros((num_envs, max_len), dtype=np.int64)
+        self.length = np.zeros(num_envs, dtype=np.int64)
+        self.cursor = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self, indices):
+        self.length[indices] = 0
+        self.cursor[indices] = 0
+
+    def pending(self):
+        return self.cursor < self.length
+
+    def pop(self, indices):
+        actions = self.actions[indices, self.cursor[indices]]
+        self.cursor[indices] += 1
+        return actions
+
+    def set(self, indices, plan):
+        self.actions[indices, :len(plan)] = plan
+        self.length[indices] = len(plan)
+        self.cursor[indices] = 0
+
+class BatchedExpertHallwayPolicy(BatchedPolicy):
+    def __init__(self, num_envs):
+        super().__init__(num_envs)
+        self.target = np.zeros(num_envs, dtype=np.int64) # packed key of the target object
+        self.plans = _ActionPlans(num_envs, 2)
+
+    def reset(self, indices=None):
+        super().reset(indices)
+        self.plans.reset(self._batch if indices is None else indices)
+
+    def select_actions(self, obs):
+        image = obs['image'] if isinstance(obs, dict) else obs
+        actions = np.full(self.num_envs, Actions.forward, dtype=np.int64)
+        associations = [self._current_associations()]
+
+        planned = self.plans.pending()
+        actions[planned] = self.plans.pop(planned)
+
+        # observe the starting room, then turn back to face the hallway
+        actions[~planned & (self.timestep == 0)] = Actions.left
+        observing = ~planned & (self.timestep == 1)
+        assert np.all(np.isin(image[observing, 2, 5, OBJECT_IDX], [KEY, BALL, BOX])) # the target object should be here
+        self.target[observing] = _pack(image[observing, 2, 5])
+        actions[observing] = Actions.right
+
+        # turn towards the door of the hallway that holds the target object
+        walking = ~planned & (self.timestep >= 2)
+        left = walking & (_pack(image[:, 1, 6]) == self.target)
+        right = walking & ~left & (_pack(image[:, 5, 6]) == self.target)
+        actions[left] = Actions.left
+        actions[right] = Actions.right
+        self.plans.set(left | right, [Actions.toggle, Actions.forward])
+
+        # add memory association if we are next to a door
+        door = walking & ((image[:, 2, 6, OBJECT_IDX] == DOOR) | (image[:, 4, 6, OBJECT_IDX] == DOOR))
+        associations.append(np.stack([self._batch[door], 2 * self.timestep[door], np.full(door.sum(), 2)], axis=1))
+
+        self.timestep += 1
+        return actions, self._merge(associations)
+
+class BatchedExpertOrderingPolicy(BatchedPolicy):
+    def __init__(self, num_envs):
+        super().__init__(num_envs)
+        self.rank = np.zeros((num_envs, NUM_KEYS), dtype=np.int64) # position of each object in the presented sequence
+
+    def select_actions(self, obs):
+        image = obs['image'] if isinstance(obs, dict) else obs
+        actions = np.full(self.num_envs, Actions.forward, dtype=np.int64)
+        associations = [self._current_associations()]
+
+        presenting = np.flatnonzero(self.timestep < 18)
+        self.rank[presenting, _pack(image[presenting, 3, 3])] = self.timestep[presenting]
+
+        # pay attention to both objects and choose the one that was presented first
+        querying = np.flatnonzero(self.timestep >= 18)
+        left_idx = self.rank[querying, _pack(image[querying, 2, 3])]
+        right_idx = self.rank[querying, _pack(image[querying, 4, 3])]
+        actions[querying] = np.where(left_idx < right_idx, Actions.left, Actions.right)
+        query = 2 * self.timestep[querying]
+        associations.append(np.stack([querying, query, 2 * left_idx], axis=1))
+        associations.append(np.stack([querying, query, 2 * right_idx], axis=1))
+
+        self.timestep += 1
+        return actions, self._merge(associations)
+
+class BatchedExpertCountingPolicy(BatchedPolicy):
+    NORMAL_ROOM_CELLS = [(2, 4), (4, 4), (2, 5), (4, 5), (2, 6), (4, 6)]
+
+    def __init__(self, num_envs, capacity=16):
+        super().__init__(num_envs)
+        # timesteps at which each object was seen, stored per episode and key up to seen_count entries
+        self.seen_count = np.zeros((num_envs, NUM_KEYS), dtype=np.int64)
+        self.seen_timesteps = np.zeros((num_envs, NUM_KEYS, capacity), dtype=np.int64)
+        self.plans = _ActionPlans(num_envs, 6)
+
+    def reset(self, indices=None):
+        super().reset(indices)
+        indices = self._batch if indices is None else indices
+        self.seen_count[indices] = 0
+        self.plans.reset(indices)
+
+    def _record_seen(self, envs, keys):
+        count = self.seen_count[envs, keys]
+        if len(count) and count.max() >= self.seen_timesteps.shape[2]:
+            grown = np.zeros(self.seen_timesteps.shape[:2] + (2 * self.seen_timesteps.shape[2],), dtype=np.int64)
+            grown[:, :, :self.seen_timesteps.shape[2]] = self.seen_timesteps
+            self.seen_timesteps = grown
+        self.seen_timesteps[envs, keys, count] = self.timestep[envs]
+        self.seen_count[envs, keys] += 1
+
+    def select_actions(self, obs):
+        image = obs['image'] if isinstance(obs, dict) else obs
+        actions = np.full(self.num_envs, Actions.forward, dtype=np.int64)
+        associations = [self._current_associations()]
+
+        planned = self.plans.pending()
+        actions[planned] = self.plans.pop(planned)
+
+        # normal room: remember every object and walk through the door
+        normal = np.flatnonzero(~planned & (image[:, 3, 3, OBJECT_IDX] == DOOR))
+        for x, y in self.NORMAL_ROOM_CELLS:
+            tiles = image[normal, x, y]
+            seen = tiles[:, OBJECT_IDX] != EMPTY
+            self._record_seen(normal[seen], _pack(tiles[seen]))
+        self.plans.set(normal, [Actions.forward, Actions.toggle, Actions.forward])
+
+        # test room: attend to every previous sighting of the object and pick a door by parity
+        test = np.flatnonzero(~planned & (image[:, 3, 3, OBJECT_IDX] != DOOR) & (image[:, 2, 3, OBJECT_IDX] == DOOR))
+        keys = _pack(image[test, 3, 4])
+        counts = self.seen_count[test, keys]
+        sightings = np.arange(self.seen_timesteps.shape[2]) < counts[:, None]
+        envs, slots = np.nonzero(sightings)
+        past = self.seen_timesteps[test[envs], keys[envs], slots]
+        associations.append(np.stack([test[envs], 2 * self.timestep[test[envs]], 2 * past], axis=1))
+
+        even = test[counts % 2 == 0]
+        odd = test[counts % 2 == 1]
+        actions[even] = Actions.left
+        actions[odd] = Actions.right
+        self.plans.set(even, [Actions.forward, Actions.right, Actions.forward, Actions.forward, Actions.toggle, Actions.forward])
+        self.plans.set(odd, [Actions.forward, Actions.left, Actions.forward, Actions.forward, Actions.toggle, Actions.forward])
+
+        self.timestep += 1
+        return actions, self._merge(associations)
@@ -0,0 +1,26 @@
+from minigrid.core.constants import COLOR_TO_IDX, OBJECT_TO_IDX
+
+# Each tile is encoded as a 3 dimensional tuple: (OBJECT_IDX, COLOR_IDX, STATE)
+OBJECT_IDX = 0
+COLOR_IDX = 1
+STATE = 2
+
+# Integer codes of the object types seen by the expert policies
+UNSEEN = OBJECT_TO_IDX['unseen']
+EMPTY = OBJECT_TO_IDX['empty']
+WALL = OBJECT_TO_IDX['wall']
+DOOR = OBJECT_TO_IDX['door']
+KEY = OBJECT_TO_IDX['key']
+BALL = OBJECT_TO_IDX['ball']
+BOX = OBJECT_TO_IDX['box']
+
+# An (object, color) pair packed into a single integer in [0, NUM_KEYS)
+NUM_COLORS = len(COLOR_TO_IDX)
+NUM_KEYS = len(OBJECT_TO_IDX) * NUM_COLORS
+
+def pack_key(obj, color):
+    return obj * NUM_COLORS + color
+
+def tile_key(obs, x, y):
+    """Packed (object, color) key of the tile at (x, y) of an encoded image."""
+    return obs.item(x, y, OBJECT_IDX) * NUM_COLORS + obs.item(x, y, COLOR_IDX)
@@ -1,63 +1,61 @@
+import numpy as np
 from minigrid.core.actions import Actions
-from minigrid.core.constants import IDX_TO_OBJECT, IDX_TO_COLOR
-from ltmb.policies import Policy
-from collections import defaultdict
-from queue import Queue
+from ltmb.data.associations import MemoryAssociations
+from ltmb.policies import ExpertPolicy
+from ltmb.policies.codes import OBJECT_IDX, UNSEEN, EMPTY, WALL, DOOR, NUM_KEYS, tile_key
 
-# Each tile is encoded as a 3 dimensional tuple: (OBJECT_IDX, COLOR_IDX, STATE)
-OBJECT_IDX = 0
-COLOR_IDX = 1
-STATE = 2
+class ExpertCountingPolicy(ExpertPolicy):
+    # scripted actions that are taken before looking at the observations again
+    LEAVE_NORMAL_ROOM = (Actions.forward, Actions.toggle, Actions.forward)
+    LEAVE_BY_LEFT_DOOR = (Actions.forward, Actions.right, Actions.forward, Actions.forward, Actions.toggle, Actions.forward)
+    LEAVE_BY_RIGHT_DOOR = (Actions.forward, Actions.left, Actions.forward, Actions.forward, Actions.toggle, Actions.forward)
 
-class ExpertCountingPolicy(Policy):
     def __init__(self):
+        # timesteps at which each packed (object, color) key was seen, stored in the first seen_count[key] entries of its row
+        self.seen_timesteps = np.zeros((NUM_KEYS, 16), dtype=np.int32)
+        self.reset()
+
+    def reset(self):
         self.timestep = 0
-        self.memory_associations = []
-        self.objects_seen = defaultdict(list) # maps object to list of timesteps
-        self.action_queue = Queue()
+        self.memory_associations = MemoryAssociations()
+        self.seen_count = [0] * NUM_KEYS
+        self.plan = ()
+        self.cursor = 0
 
-    def _get_object(self, obs, x, y):
-        return IDX_TO_OBJECT[obs[x, y, OBJECT_IDX]]
-    
-    def _get_color(self, obs, x, y):
-        return IDX_TO_COLOR[obs[x, y, COLOR_IDX]]
+    def _record_seen(self, key):
+        count = self.seen_count[key]
+        if count == self.seen_timesteps.shape[1]:
+            self.seen_timesteps = np.concatenate([self.seen_timesteps, np.zeros_like(self.seen_timesteps)], axis=1)
+        self.seen_timesteps[key, count] = self.timestep
+        self.seen_count[key] = count + 1
 
     def select_action(self, obs):
         obs = obs['image']
         action = None
 
-        self.memory_associations.append((2 * self.timestep, 2 * self.timestep)) # we need to pay attention to the current observation
-        if self.action_queue.qsize() > 0:
-            action = self.action_queue.get()
-        elif self._get_object(obs, 3, 3) == 'door': # we are in a normal room
+        self.memory_associations.append(2 * self.timestep, 2 * self.timestep) # we need to pay attention to the current observation
+        if self.cursor < len(self.plan):
+            action = self.plan[self.cursor]
+            self.cursor += 1
+        elif obs.item(3, 3, OBJECT_IDX) == DOOR: # we are in a normal room
             for x, y in [(2, 4), (4, 4), (2, 5), (4, 5), (2, 6), (4, 6)]:
-                object = self._get_object(obs, x, y)
-                color = self._get_color(obs, x, y)
-                if object != 'empty': self.objects_seen[(object, color)].append(self.timestep)
-                assert object != 'door' and object != 'unseen' and object != 'wall'
+                object = obs.item(x, y, OBJECT_IDX)
+                if object != EMPTY: self._record_seen(tile_key(obs, x, y))
+                assert object != DOOR and object != UNSEEN and object != WALL
             action = Actions.forward
-            future_action_list = [Actions.forward, Actions.toggle, Actions.forward]
-            for a in future_action_list:
-                self.action_queue.put(a)
-        elif self._get_object(obs, 2, 3) == 'door': # we are in a test room
-            object, color = self._get_object(obs, 3, 4), self._get_color(obs, 3, 4)
-            for past_timestep in self.objects_seen[(object, color)]:
-                self.memory_associations.append((2 * self.timestep, 2 * past_timestep)) # multiply by 2 because observations are at even indicies and actions are at odd indicies
-            if len(self.objects_seen[(object, color)]) % 2 == 0:
+            self.plan, self.cursor = self.LEAVE_NORMAL_ROOM, 0
+        elif obs.item(2, 3, OBJECT_IDX) == DOOR: # we are in a test room
+            key = tile_key(obs, 3, 4)
+            count = self.seen_count[key]
+            self.memory_associations.extend(2 * self.timestep, 2 * self.seen_timesteps[key, :count]) # multiply by 2 because observations are at even indicies and actions are at odd indicies
+            if count % 2 == 0:
                 action = Actions.left
-                future_action_list = [Actions.forward, Actions.right, Actions.forward, Actions.forward, Actions.toggle, Actions.forward]
-                for a in future_action_list:
-                    self.action_queue.put(a)
+                self.plan, self.cursor = self.LEAVE_BY_LEFT_DOOR, 0
             else:
                 action = Actions.right
-                future_action_list = [Actions.forward, Actions.left, Actions.forward, Actions.forward, Actions.toggle, Actions.forward]
-                for a in future_action_list:
-                    self.action_queue.put(a)
+                self.plan, self.cursor = self.LEAVE_BY_RIGHT_DOOR, 0
 
         assert action is not None
 
         self.timestep += 1
-        return action
-    
-    def get_memory_associations(self):
-        return self.memory_associations
\ No newline at end of file
+        return action
\ No newline at end of file
@@ -1,42 +1,36 @@
 from minigrid.core.actions import Actions
-from minigrid.core.constants import IDX_TO_OBJECT, IDX_TO_COLOR
-from ltmb.policies import Policy
+from ltmb.data.associations import MemoryAssociations
+from ltmb.policies import ExpertPolicy
+from ltmb.policies.codes import tile_key
 
-# Each tile is encoded as a 3 dimensional tuple: (OBJECT_IDX, COLOR_IDX, STATE)
-OBJECT_IDX = 0
-COLOR_IDX = 1
-STATE = 2
-
-class ExpertOrderingPolicy(Policy):
+class ExpertOrderingPolicy(ExpertPolicy):
     def __init__(self):
+        self.reset()
+
+    def reset(self):
         self.timestep = 0
-        self.memory_associations = []
-        self.permutation = []
+        self.memory_associations = MemoryAssociations()
+        self.permutation = [] # packed (object, color) keys in the order they were presented
+        self.rank = {} # maps packed (object, color) key to its position in the permutation
 
     def select_action(self, obs):
         obs = obs['image']
         action = None
         
-        self.memory_associations.append((2 * self.timestep, 2 * self.timestep)) # we need to pay attention to the current observation
+        self.memory_associations.append(2 * self.timestep, 2 * self.timestep) # we need to pay attention to the current observation
         action = Actions.forward
         if self.timestep < 18:
-            object, color = IDX_TO_OBJECT[obs[3, 3, OBJECT_IDX]], IDX_TO_COLOR[obs[3, 3, COLOR_IDX]]
-            self.permutation.append((object, color))
+            key = tile_key(obs, 3, 3)
+            self.rank[key] = len(self.permutation)
+            self.permutation.append(key)
         else:
-            choices = []
-            for i in [2, 4]:
-                object, color = IDX_TO_OBJECT[obs[i, 3, OBJECT_IDX]], IDX_TO_COLOR[obs[i, 3, COLOR_IDX]]
-                choices.append((object, color))
-            left_idx, right_idx = self.permutation.index(choices[0]), self.permutation.index(choices[1])
-            self.memory_associations.append((2 * self.timestep, 2 * left_idx)) # we need to pay attention the left object
-            self.memory_associations.append((2 * self.timestep, 2 * right_idx)) # we need to pay attention the right object
+            left_idx, right_idx = self.rank[tile_key(obs, 2, 3)], self.rank[tile_key(obs, 4, 3)]
+            self.memory_associations.append(2 * self.timestep, 2 * left_idx) # we need to pay attention the left object
+            self.memory_associations.append(2 * self.timestep, 2 * right_idx) # we need to pay attention the right object
             if left_idx < right_idx:
                 action = Actions.left
             else:
                 action = Actions.right
 
         self.timestep += 1
-        return action
-    
-    def get_memory_associations(self):
-        return self.memory_associations
\ No newline at end of file
+        return action
\ No newline at end of file
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 class Policy(ABC):
     @abstractmethod
     def select_action(self, obs):
@@ -8,3 +10,22 @@ class Policy(ABC):
     @abstractmethod
     def get_memory_associations(self):
         pass
+
+    def reset(self):
+        """Forget the current episode, so that the policy can be reused for the next one."""
+        pass
+
+    def get_memory_association_array(self):
+        """Memory associations as an int32 array of (query token, key token) rows."""
+        return np.array(self.get_memory_associations(), dtype=np.int32).reshape(-1, 2)
+
+class ExpertPolicy(Policy):
+    """Expert policy that records its memory associations in self.memory_associations, a MemoryAssociations."""
+
+    version = 1 # bump in a subclass whenever its actions or memory associations change, so old manifests are not regenerated
+
+    def get_memory_associations(self):
+        return self.memory_associations.tolist()
+
+    def get_memory_association_array(self):
+        return self.memory_associations.to_array()
\ No newline at end of file
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Opt-in instrumentation of the hot paths of the envs, the expert policies and dataset collection.
+#
+# Profiling is enabled per env with LTMBEnv(profile=True), or everywhere with the LTMB_PROFILE environment
+# variable: LTMB_PROFILE=1 records per-phase statistics and LTMB_PROFILE=trace also records every call as a
+# Chrome trace event. Phases are recorded by wrapping the methods of an instrumented object, so objects
+# that are not instrumented run exactly the same code as without this module.
+#
+# Each phase records its number of calls, its inclusive time and the net number of memory blocks it left
+# allocated (sys.getallocatedblocks), which counts the objects a phase creates and keeps.
+ENV_VAR = 'LTMB_PROFILE'
+MAX_EVENTS = 1_000_000 # trace events kept per process, later calls are only counted
+
+def enabled():
+    return os.environ.get(ENV_VAR, '') not in ('', '0')
+
+class Profiler:
+    """Per-phase call counts, times and allocated blocks, plus optional trace events."""
+
+    def __init__(self, trace=False):
+        self.pid = os.getpid()
+        self.stats = {} # phase -> [calls, nanoseconds, blocks]
+        self.events = [] if trace else None # (phase, start ns, duration ns, pid, thread id)
+        self.dropped = 0
+
+    def _record(self, name, stats, start, end, blocks):
+        stats[0] += 1
+        stats[1] += end - start
+        stats[2] += blocks
+        if self.events is not None:
+            if len(self.events) < MAX_EVENTS:
+                self.events.append((name, start, end - start, self.pid, threading.get_ident()))
+            else:
+                self.dropped += 1
+
+    def wrap(self, name, fn):
+        """Return fn recording its calls as phase name."""
+        stats = self.stats.setdefault(name, [0, 0, 0])
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            blocks = sys.getallocatedblocks()
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._record(name, stats, start, time.perf_counter_ns(), sys.getallocatedblocks() - blocks)
+        return wrapper
+
+    def instrument(self, obj, methods, prefix=None):
+        """Record calls to the given methods of obj as phases '<prefix>.<method>' (prefix defaults to the class name)."""
+        prefix = type(obj).__name__ if prefix is None else prefix
+        for method in methods:
+            setattr(obj, method, self.wrap(f'{prefix}.{method}', getattr(obj, method)))
+        return obj
+
+    @contextmanager
+    def phase(self, name):
+        """Record the body of a with statement as one call of phase name."""
+        stats = self.stats.setdefault(name, [0, 0, 0])
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self._record(name, stats, start, time.perf_counter_ns(), sys.getallocatedblocks() - blocks)
+
+    def drain(self):
+        """Return everything recorded so far as a picklable snapshot and start over."""
+        snapshot = {
+            'stats': {name: list(stats) for name, stats in self.stats.items() if stats[0]},
+            'events': list(self.events) if self.events is not None else None,
+            'dropped': self.dropped,
+        }
+        # The wrappers hold on to their stats lists, so they are cleared in place
+        for stats in self.stats.values():
+            stats[:] = [0, 0, 0]
+        if self.events is not None:
+            self.events.clear()
+        self.dropped = 0
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add a snapshot drained from another profiler, e.g. one of a collection worker."""
+        for name, (calls, elapsed, blocks) in snapshot['stats'].items():
+            stats = self.stats.setdefault(name, [0, 0, 0])
+            stats[0] += calls
+            stats[1] += elapsed
+            stats[2] += blocks
+        if snapshot['events']:
+            if self.events is None:
+                self.events = []
+            room = max(0, MAX_EVENTS - len(self.events))
+            self.events.extend(snapshot['events'][:room])
+            self.dropped += len(snapshot['events']) - min(room, len(snapshot['events']))
+        self.dropped += snapshot['dropped']
+
+    def summary(self):
+        """Table of the recorded phases, slowest in total first. Times are inclusive of nested phases."""
+        rows = sorted(((name, stats) for name, stats in self.stats.items() if stats[0]), key=lambda row: -row[1][1])
+        width = max([len('phase')] + [len(name) for name, _ in rows])
+        lines = [f"{'phase':<{width}}  {'calls':>10}  {'total s':>9}  {'mean us':>9}  {'blocks/call':>11}"]
+        for name, (calls, elapsed, blocks) in rows:
+            lines.append(f"{name:<{width}}  {calls:>10}  {elapsed / 1e9:>9.3f}  {elapsed / calls / 1e3:>9.2f}  {blocks / calls:>11.2f}")
+        if self.dropped:
+            lines.append(f"({self.dropped} trace events were dropped after the first {MAX_EVENTS} of a process)")
+        return '\n'.join(lines)
+
+    def save_trace(self, path):
+        """Write the trace events as Chrome trace JSON, viewable in chrome://tracing or Perfetto."""
+        events = [
+            {'name': name, 'ph': 'X', 'ts': start / 1e3, 'dur': duration / 1e3, 'pid': pid, 'tid': tid}
+            for name, start, duration, pid, tid in self.events or []
+        ]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+_profiler = None
+
+def profiler():
+    """The profiler of this process, created on first use (with trace events if LTMB_PROFILE=trace)."""
+    global _profiler
+    # A forked worker inherits its parent's profiler, which must not be reported twice
+    if _profiler is None or _profiler.pid != os.getpid():
+        _profiler = Profiler(trace=os.environ.get(ENV_VAR) == 'trace')
+    return _profiler
+
+def phase(name):
+    """profiler().phase(name) if profiling is enabled, otherwise a context manager that does nothing."""
+    return profiler().phase(name) if enabled() else nullcontext()
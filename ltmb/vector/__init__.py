@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from ltmb.vector.base import BatchedLTMBEnv
+from ltmb.vector.hallway import BatchedHallwayEnv
+from ltmb.vector.ordering import BatchedOrderingEnv
+from ltmb.vector.counting import BatchedCountingEnv
+
+BATCHED_ENVS = {
+    'LTMB-Hallway-v0': BatchedHallwayEnv,
+    'LTMB-Ordering-v0': BatchedOrderingEnv,
+    'LTMB-Counting-v0': BatchedCountingEnv,
+}
+
+def make_batched(env_id, num_envs, **kwargs):
+    """Create the batched version of a registered LTMB env."""
+    return BATCHED_ENVS[env_id](num_envs, **kwargs)
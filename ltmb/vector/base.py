@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+from gymnasium.utils import seeding
+
+from minigrid.core.actions import Actions
+from minigrid.core.constants import COLOR_NAMES, COLOR_TO_IDX, DIR_TO_VEC, OBJECT_TO_IDX, STATE_TO_IDX, TILE_PIXELS
+from ltmb.envs.render import render_top_down
+from ltmb.envs.view import EMPTY, PAD, gen_images, padded_encoding
+
+# Integer codes of the tiles used by the LTMB tasks
+DOOR = OBJECT_TO_IDX['door']
+KEY = OBJECT_TO_IDX['key']
+BALL = OBJECT_TO_IDX['ball']
+BOX = OBJECT_TO_IDX['box']
+OPEN = STATE_TO_IDX['open']
+CLOSED = STATE_TO_IDX['closed']
+LOCKED = STATE_TO_IDX['locked']
+
+# COLOR_NAMES is sorted alphabetically, so indices drawn from it must be mapped to COLOR_IDX codes
+COLOR_NAME_TO_IDX = np.array([COLOR_TO_IDX[color] for color in COLOR_NAMES])
+DIR_VEC = np.array(DIR_TO_VEC)
+
+class BatchedLTMBEnv(ABC):
+    """Steps num_envs episodes of one LTMB task together.
+
+    The grids of all episodes are held as one integer encoding of shape (B, W + 2 * PAD, H + 2 * PAD, 3)
+    and the agents as arrays of positions and directions. Each episode owns its own np_random generator,
+    seeded the same way as the reference MiniGridEnv, so under the same seeds the batch reproduces the
+    observations and rewards of the single-episode envs exactly.
+
+    Finished episodes are not reset automatically; call reset(indices=...) on them.
+    """
+
+    mission = None
+
+    def __init__(self, num_envs, width, height, max_steps):
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.max_steps = max_steps
+
+        self.grid = padded_encoding(width, height, (num_envs,))
+        self.agent_pos = np.zeros((num_envs, 2), dtype=np.int64)
+        self.agent_dir = np.zeros(num_envs, dtype=np.int64)
+        self.step_count = np.zeros(num_envs, dtype=np.int64)
+        self.np_random = [None] * num_envs
+        self._batch = np.arange(num_envs)
+
+    @abstractmethod
+    def _reset_env(self, i):
+        pass
+
+    @abstractmethod
+    def step(self, actions):
+        pass
+
+    def _rand_int(self, i, low, high):
+        return self.np_random[i].integers(low, high)
+
+    def _rand_float(self, i, low, high):
+        return self.np_random[i].uniform(low, high)
+
+    def _set(self, i, x, y, tile):
+        self.grid[i, x + PAD, y + PAD] = tile
+
+    def _cells(self, pos):
+        # Encoded tiles at one (x, y) position per episode
+        return self.grid[self._batch, pos[:, 0] + PAD, pos[:, 1] + PAD]
+
+    def reset(self, seed=None, indices=None):
+        """Reset the episodes in indices (all by default).
+
+        seed is either a list with one seed per reset episode or an int, in which case episode k of
+        the reset is seeded with seed + k. Episodes without a seed keep drawing from their generator.
+        """
+        indices = range(self.num_envs) if indices is None else indices
+        if seed is None or isinstance(seed, (int, np.integer)):
+            seeds = [None if seed is None else seed + k for k in range(len(indices))]
+        else:
+            seeds = list(seed)
+            assert len(seeds) == len(indices), 'expected one seed per reset episode'
+
+        for i, s in zip(indices, seeds):
+            if s is not None or self.np_random[i] is None:
+                self.np_random[i], _ = seeding.np_random(None if s is None else int(s))
+            self.step_count[i] = 0
+            self._reset_env(i)
+
+        return self.gen_obs(), {}
+
+    def _step_agent(self, actions):
+        """Apply the movement and toggle rules of MiniGridEnv.step to every episode.
+
+        None of the tasks let the agent carry anything, so pickup and drop never change the grid.
+        Returns the truncation flags.
+        """
+        if np.any((actions < 0) | (actions > Actions.done)):
+            raise ValueError(f'Unknown action in {actions}')
+        self.step_count += 1
+
+        fwd_pos = self.agent_pos + DIR_VEC[self.agent_dir]
+        fwd_cell = self._cells(fwd_pos)
+        fwd_obj, fwd_state = fwd_cell[:, 0], fwd_cell[:, 2]
+
+        self.agent_dir = np.where(actions == Actions.left, (self.agent_dir - 1) % 4, self.agent_dir)
+        self.agent_dir = np.where(actions == Actions.right, (self.agent_dir + 1) % 4, self.agent_dir)
+
+        can_overlap = (fwd_obj == EMPTY[0]) | ((fwd_obj == DOOR) & (fwd_state == OPEN))
+        forward = (actions == Actions.forward) & can_overlap
+        self.agent_pos[forward] = fwd_pos[forward]
+
+        # Toggling opens or closes unlocked doors and replaces boxes by their (empty) contents
+        toggle = actions == Actions.toggle
+        door = np.flatnonzero(toggle & (fwd_obj == DOOR) & (fwd_state != LOCKED))
+        self.grid[door, fwd_pos[door, 0] + PAD, fwd_pos[door, 1] + PAD, 2] = 1 - fwd_state[door]
+        box = np.flatnonzero(toggle & (fwd_obj == BOX))
+        self.grid[box, fwd_pos[box, 0] + PAD, fwd_pos[box, 1] + PAD] = EMPTY
+
+        return self.step_count >= self.max_steps
+
+    def gen_obs(self):
+        return {
+            'image': gen_images(self.grid, self.agent_pos, self.agent_dir),
+            'direction': self.agent_dir.copy(),
+            'mission': [self.mission] * self.num_envs,
+        }
+
+    def render(self, tile_size=TILE_PIXELS, highlight=True, out=None):
+        """Top-down frames of every episode, shape (B, H * tile_size, W * tile_size, 3).
+
+        Image observations can be rendered as the agent's point of view with ltmb.envs.render.render_pov.
+        """
+        grid = self.grid[:, PAD:PAD + self.width, PAD:PAD + self.height]
+        return render_top_down(grid, self.agent_pos, self.agent_dir, tile_size, highlight, out)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import numpy as np
+
+from minigrid.core.actions import Actions
+from minigrid.core.constants import COLOR_NAMES
+from ltmb.envs.counting import CountingEnv
+from ltmb.envs.view import EMPTY, PAD, WALL, padded_encoding
+from ltmb.vector.base import BALL, BOX, CLOSED, COLOR_NAME_TO_IDX, DOOR, KEY, BatchedLTMBEnv
+
+BLUE_DOOR = (DOOR, COLOR_NAME_TO_IDX[COLOR_NAMES.index('blue')], CLOSED)
+GREEN_DOOR = (DOOR, COLOR_NAME_TO_IDX[COLOR_NAMES.index('green')], CLOSED)
+RED_DOOR = (DOOR, COLOR_NAME_TO_IDX[COLOR_NAMES.index('red')], CLOSED)
+OBJECT_CELLS = [(1, 1), (3, 1), (1, 2), (3, 2), (1, 3), (3, 3)]
+
+class BatchedCountingEnv(BatchedLTMBEnv):
+    mission = CountingEnv._gen_mission()
+
+    def __init__(self, num_envs, length=5, test_freq=0.3, empty_freq=0.1):
+        if length < 1:
+            raise ValueError('length must be greater than 0')
+        if test_freq < 0 or test_freq > 1:
+            raise ValueError('test_freq must be between 0 and 1')
+        if empty_freq < 0 or empty_freq > 1:
+            raise ValueError('empty_freq must be between 0 and 1')
+
+        self.length = length # number of rooms
+        self.test_freq = test_freq # frequency of test rooms
+        self.empty_freq = empty_freq # frequency of empty object cells
+        super().__init__(num_envs, 5, 5, 7 * length)
+
+        self.layout = padded_encoding(5, 5)
+        self.layout[PAD:PAD + 5, [PAD, PAD + 4]] = WALL
+        self.layout[[PAD, PAD + 4], PAD:PAD + 5] = WALL
+
+        # count of each (object, color) pair, indexed by object * len(COLOR_NAMES) + color in draw order
+        self.object_count = np.zeros((num_envs, 3 * len(COLOR_NAMES)), dtype=np.int64)
+        self.rooms_visited = np.ones(num_envs, dtype=np.int64)
+        self.correct_door = np.zeros((num_envs, 2), dtype=np.int64)
+
+    def _gen_normal_room(self, i):
+        self.agent_pos[i] = (2, 3)
+        self.agent_dir[i] = 3 # facing up
+        self._set(i, 2, 0, BLUE_DOOR)
+
+        for x, y in OBJECT_CELLS:
+            obj = self._rand_int(i, 0, 3)
+            color = self._rand_int(i, 0, len(COLOR_NAMES))
+            if self._rand_float(i, 0, 1) > self.empty_freq:
+                self._set(i, x, y, ((BALL, KEY, BOX)[obj], COLOR_NAME_TO_IDX[color], 0))
+                self.object_count[i, obj * len(COLOR_NAMES) + color] += 1
+
+    def _gen_test_room(self, i):
+        self.agent_pos[i] = (2, 3)
+        self.agent_dir[i] = 3 # facing up
+        self._set(i, 1, 0, GREEN_DOOR)
+        self._set(i, 3, 0, RED_DOOR)
+
+        obj = self._rand_int(i, 0, 3)
+        color = self._rand_int(i, 0, len(COLOR_NAMES))
+        self._set(i, 2, 1, ((BALL, KEY, BOX)[obj], COLOR_NAME_TO_IDX[color], 0))
+        self.correct_door[i] = (1, 0) if self.object_count[i, obj * len(COLOR_NAMES) + color] % 2 == 0 else (3, 0)
+
+    def _reset_env(self, i):
+        self.grid[i] = self.layout
+        self.object_count[i] = 0
+        self.rooms_visited[i] = 1
+        self._gen_normal_room(i)
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        actions = np.where(actions == Actions.pickup, Actions.toggle, actions) # Don't allow picking up objects
+        truncated = self._step_agent(actions)
+
+        reward = np.zeros(self.num_envs)
+        success = np.zeros(self.num_envs, dtype=bool)
+
+        at_door = self.agent_pos[:, 1] == 0
+        # the previous room was a test room and the agent chose the wrong door
+        wrong = at_door & (self.agent_pos[:, 0] != 2) & np.any(self.correct_door != self.agent_pos, axis=1)
+        finished = at_door & ~wrong & (self.rooms_visited == self.length)
+        reward[finished] = 1
+        success[finished] = True
+        terminated = wrong | finished
+
+        # Generate a new room
+        for i in np.flatnonzero(at_door & ~terminated):
+            self.grid[i, PAD + 1:PAD + 4, PAD + 1:PAD + 4] = EMPTY
+            self.grid[i, PAD:PAD + 5, PAD] = WALL
+            if self._rand_float(i, 0, 1) <= self.test_freq:
+                self._gen_test_room(i)
+            else:
+                self._gen_normal_room(i)
+            self.rooms_visited[i] += 1
+
+        ended = truncated & ~terminated
+        reward[ended] = self.rooms_visited[ended] == self.length
+        success[ended] = self.rooms_visited[ended] == self.length
+
+        return self.gen_obs(), reward, terminated, truncated, {'success': success}
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import numpy as np
+
+from minigrid.core.actions import Actions
+from minigrid.core.constants import COLOR_NAMES
+from ltmb.envs.hallway import HallwayEnv
+from ltmb.envs.view import PAD, WALL, padded_encoding
+from ltmb.vector.base import BALL, BOX, CLOSED, COLOR_NAME_TO_IDX, DOOR, KEY, BatchedLTMBEnv
+
+class BatchedHallwayEnv(BatchedLTMBEnv):
+    mission = HallwayEnv._gen_mission()
+
+    def __init__(self, num_envs, length=5, max_steps=16):
+        self.length = length # number of vertical hallways
+        self.size = 4 * length + 5
+        max_steps = max(max_steps, self.size + 20)
+        super().__init__(num_envs, self.size, self.size, max_steps)
+
+        self.layout = self._gen_layout()
+        self.success_pos = np.zeros((num_envs, 2), dtype=np.int64)
+
+    def _gen_layout(self):
+        # The walls only depend on the length, so they are encoded once and copied on every reset
+        layout = padded_encoding(self.width, self.height)
+        walls = np.zeros((self.width, self.height), dtype=bool)
+        walls[:, 0] = walls[:, -1] = walls[0, :] = walls[-1, :] = True
+
+        upper_room_wall = self.height // 2 - 2
+        lower_room_wall = self.height // 2 + 2
+        walls[1:5, upper_room_wall] = walls[1:5, lower_room_wall] = True
+        walls[4, upper_room_wall + 1] = walls[4, lower_room_wall - 1] = True
+        walls[5:self.width - 2, upper_room_wall + 1] = walls[5:self.width - 2, lower_room_wall - 1] = True
+        for i in range(6, self.width - 2, 4):
+            for j in range(2):
+                walls[i, upper_room_wall - j] = walls[i + 2, upper_room_wall - j] = True
+                walls[i, lower_room_wall + j] = walls[i + 2, lower_room_wall + j] = True
+            walls[i + 1, upper_room_wall - 1] = walls[i + 1, lower_room_wall + 1] = True
+
+        layout[PAD:PAD + self.width, PAD:PAD + self.height][walls] = WALL
+        return layout
+
+    def _rand_obj(self, i, target_obj, target_color):
+        # Same draws as HallwayEnv._rand_obj
+        obj = (BALL, KEY, BOX)[self._rand_int(i, 0, 3)]
+        color = self._rand_int(i, 0, len(COLOR_NAMES))
+        if obj == target_obj and color == target_color:
+            new_colors = [c for c in range(len(COLOR_NAMES)) if c != target_color]
+            color = new_colors[self._rand_int(i, 0, len(new_colors))]
+        return obj, COLOR_NAME_TO_IDX[color], 0
+
+    def _reset_env(self, i):
+        self.grid[i] = self.layout
+        upper_room_wall = self.height // 2 - 2
+        lower_room_wall = self.height // 2 + 2
+
+        # Random draws happen in the same order as HallwayEnv._gen_grid
+        target_color = self._rand_int(i, 0, len(COLOR_NAMES))
+        target_obj = (KEY, BALL, BOX)[self._rand_int(i, 0, 3)]
+        for x in range(6, self.width - 2, 4):
+            self._set(i, x + 1, upper_room_wall + 1, (DOOR, COLOR_NAME_TO_IDX[self._rand_int(i, 0, len(COLOR_NAMES))], CLOSED))
+            self._set(i, x + 1, lower_room_wall - 1, (DOOR, COLOR_NAME_TO_IDX[self._rand_int(i, 0, len(COLOR_NAMES))], CLOSED))
+            self._set(i, x + 1, upper_room_wall, self._rand_obj(i, target_obj, target_color))
+            self._set(i, x + 1, lower_room_wall, self._rand_obj(i, target_obj, target_color))
+
+        self.agent_pos[i] = (2, self.height // 2)
+        self.agent_dir[i] = 0
+
+        target = (target_obj, COLOR_NAME_TO_IDX[target_color], 0)
+        self._set(i, 1, self.height // 2 - 1, target)
+
+        target_hallway = self._rand_int(i, 0, self.length)
+        if self._rand_int(i, 0, 2) == 0: # target object in the upper hallway
+            target_pos = (7 + 4 * target_hallway, upper_room_wall)
+            self.success_pos[i] = (7 + 4 * target_hallway, upper_room_wall + 1)
+        else: # target object in the lower hallway
+            target_pos = (7 + 4 * target_hallway, lower_room_wall)
+            self.success_pos[i] = (7 + 4 * target_hallway, lower_room_wall - 1)
+        self._set(i, *target_pos, target)
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        actions = np.where(actions == Actions.pickup, Actions.toggle, actions) # Don't allow picking up objects
+        truncated = self._step_agent(actions)
+
+        # the episode ends once the agent stands in a doorway
+        terminated = self._cells(self.agent_pos)[:, 0] == DOOR
+        success = terminated & np.all(self.agent_pos == self.success_pos, axis=1)
+        reward = np.where(success, 1 - 0.9 * (self.step_count / self.max_steps), 0.0)
+
+        return self.gen_obs(), reward, terminated, truncated, {'success': success}
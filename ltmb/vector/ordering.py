@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import itertools
+
+import numpy as np
+
+from minigrid.core.actions import Actions
+from minigrid.core.constants import COLOR_NAMES
+from ltmb.envs.ordering import OrderingEnv
+from ltmb.envs.view import EMPTY
+from ltmb.vector.base import BALL, BOX, COLOR_NAME_TO_IDX, KEY, BatchedLTMBEnv
+
+NUM_PRESENTED = 18 # number of objects presented before the queries start
+
+# Encoded tiles of every (object, color) pair in the order of OrderingEnv.permutation before shuffling
+OBJECTS = np.array([(obj, COLOR_NAME_TO_IDX[c], 0) for obj, c in itertools.product([BALL, KEY, BOX], range(len(COLOR_NAMES)))], dtype=np.uint8)
+
+class BatchedOrderingEnv(BatchedLTMBEnv):
+    """Batched OrderingEnv.
+
+    The shuffle of the presented sequence and the pair of objects of each query are drawn from the
+    episode's own np_random generator (np_random.shuffle and the minigrid _rand_subset helper).
+    """
+
+    mission = OrderingEnv._gen_mission()
+
+    def __init__(self, num_envs, length=5):
+        self.length = length # number of commands
+        super().__init__(num_envs, 7, 7, NUM_PRESENTED + length)
+
+        self.permutation = np.zeros((num_envs, NUM_PRESENTED), dtype=np.int64) # indices into OBJECTS
+        self.rank = np.zeros((num_envs, NUM_PRESENTED), dtype=np.int64) # position of each object in the permutation
+        self.choices = np.zeros((num_envs, 2), dtype=np.int64)
+        self.timestep = np.zeros(num_envs, dtype=np.int64)
+
+    def _reset_env(self, i):
+        # The room has no walls and only the object cells ever change
+        for x in (2, 3, 4):
+            self._set(i, x, 3, EMPTY)
+        self.agent_pos[i] = (3, 6)
+        self.agent_dir[i] = 3 # facing up
+
+        self.permutation[i] = np.arange(NUM_PRESENTED)
+        self.np_random[i].shuffle(self.permutation[i])
+        self.rank[i, self.permutation[i]] = np.arange(NUM_PRESENTED)
+        self.timestep[i] = 0
+        self._set(i, 3, 3, OBJECTS[self.permutation[i, 0]])
+
+    def _gen_new_rooms(self):
+        presenting = np.flatnonzero(self.timestep < NUM_PRESENTED)
+        self._set(presenting, 3, 3, OBJECTS[self.permutation[presenting, self.timestep[presenting]]])
+
+        querying = np.flatnonzero(self.timestep >= NUM_PRESENTED)
+        self._set(querying, 3, 3, EMPTY)
+        for i in querying:
+            # Same draws as MiniGridEnv._rand_subset(permutation, 2)
+            first = self._rand_int(i, 0, NUM_PRESENTED)
+            second = self._rand_int(i, 0, NUM_PRESENTED - 1)
+            second += second >= first
+            self.choices[i] = self.permutation[i, first], self.permutation[i, second]
+        self._set(querying, 2, 3, OBJECTS[self.choices[querying, 0]])
+        self._set(querying, 4, 3, OBJECTS[self.choices[querying, 1]])
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        querying = self.timestep >= NUM_PRESENTED
+        earlier = self.rank[self._batch, self.choices[:, 0]] < self.rank[self._batch, self.choices[:, 1]]
+        correct_action = np.where(earlier, Actions.left, Actions.right)
+        incorrect = querying & (actions != correct_action)
+
+        # generate a new room
+        self.timestep += 1
+        self._gen_new_rooms()
+
+        # Don't allow moving or picking up objects
+        truncated = self._step_agent(np.full(self.num_envs, Actions.drop))
+
+        finished = ~incorrect & (self.timestep == NUM_PRESENTED + self.length)
+        terminated = incorrect | finished
+        truncated = truncated & ~finished
+        reward = np.where(incorrect, -1.0, np.where(finished, 1.0, 0.0))
+
+        return self.gen_obs(), reward, terminated, truncated, {'success': finished}
@@ -0,0 +1,19 @@
+import argparse
+from ltmb.data import convert_pickle
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a pickled LTMB dataset into the columnar format.')
+    parser.add_argument('--src', type=str, required=True, help='Pickled dataset produced by generate_data.py. (*.pkl)')
+    parser.add_argument('--dst', type=str, required=True, help='Output directory for the columnar dataset.')
+    parser.add_argument('--env', type=str, default=None, help='Gym environment name the dataset was collected from.')
+    parser.add_argument('--length', type=int, default=None, help='Length of the task the dataset was collected with.')
+    parser.add_argument('--image_encoding', type=str, default='raw', choices=['raw', 'dedup'], help='Store every image (raw) or every distinct image once (dedup).')
+    args = parser.parse_args()
+
+    options = {'length': args.length} if args.length is not None else {}
+    dataset = convert_pickle(args.src, args.dst, args.env, options, args.image_encoding)
+    print("Episodes: ", len(dataset))
+    print("Steps: ", dataset.meta['num_steps'])
+
+if __name__ == '__main__':
+    main()
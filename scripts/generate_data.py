@@ -1,10 +1,40 @@
 import gymnasium as gym
 import pickle
 import argparse
+import itertools
+import json
 import ltmb
+import os
 import random
+from ltmb import profiling
+from ltmb.data import ColumnarWriter, ColumnarDataset, Manifest, MANIFEST_FILE, PipelinedWriter, QUARANTINE_FILE, add_quarantine, load_quarantine
+from ltmb.data.columnar import META_FILE, seeds_hash
+from ltmb.data.rollout import iter_tasks, iter_trajectories, run_episode, shard_tasks
 from ltmb.policies import Policy, ExpertHallwayPolicy, ExpertOrderingPolicy, ExpertCountingPolicy
-from typing import Type
+from typing import List, Tuple, Type
+
+EXPERTS = {
+    'LTMB-Hallway-v0': ExpertHallwayPolicy,
+    'LTMB-Ordering-v0': ExpertOrderingPolicy,
+    'LTMB-Counting-v0': ExpertCountingPolicy,
+}
+COUNTING_OPTIONS = ('test_freq', 'empty_freq') # options that only the Counting task takes
+SWEEP_KEYS = ('env', 'length') + COUNTING_OPTIONS + ('runs', 'seed')
+SWEEP_FILE = 'sweep.json'
+
+def profile_writer(writer: ColumnarWriter) -> ColumnarWriter:
+    # Chunk encoding and flushing run on the writer thread, so they are recorded as phases of their own
+    if profiling.enabled():
+        profiling.profiler().instrument(writer, ['add_episode', 'flush'])
+    return writer
+
+def report_profile(trace: str = None):
+    if not profiling.enabled():
+        return
+    print(profiling.profiler().summary())
+    if trace is not None:
+        profiling.profiler().save_trace(trace)
+        print(f"Saved a trace of the phases to {trace}")
 
 def record_video(env_name: str, expert: Type[Policy], filename: str, options: dict = {}):
     policy = expert()
@@ -18,66 +48,281 @@ def record_video(env_name: str, expert: Type[Policy], filename: str, options: di
         obs, reward, terminated, truncated, info = env.step(action)
         done = terminated or truncated
 
-    assert info['success']
+    if not info.get('success', False):
+        print("Warning: the recorded episode did not succeed")
     env.close()
 
-def collect_trajectories(env_name: str, expert: Type[Policy], num_trajectories: int, options: dict = {}):
-    env = gym.make(env_name, **options)
+def collect_trajectories(env_name: str, expert: Type[Policy], num_trajectories: int, options: dict = {}, seeds: List[int] = None, workers: int = 1, quarantine: list = None, worker_stats: dict = None):
+    # Episodes that fail raise, unless a quarantine list is given, in which case they are left out and added to it.
+    # If given, worker_stats is filled with (episodes, seconds) per worker pid.
+    if seeds is None:
+        seeds = [random.randint(0, 10**9) for _ in range(num_trajectories)]
+    assert len(seeds) == num_trajectories
+
     trajectories = []
-    avg_len, max_len = 0, 0
+    results = iter_trajectories(env_name, expert, seeds, options, workers, worker_stats, quarantine=quarantine is not None)
+    for seed, (trajectory, memory_associations) in zip(seeds, results):
+        if trajectory is None:
+            print(f"Quarantined: {'; '.join(memory_associations['problems'])}")
+            quarantine.append({'index': None, 'seed': seed, **memory_associations})
+            continue
+        # memory associations are returned as lists of tuples, the layout of the pickled datasets
+        trajectories.append((trajectory, [tuple(pair) for pair in memory_associations.tolist()]))
+    lengths = [len(trajectory) for trajectory, _ in trajectories]
+    return trajectories, sum(lengths) / max(len(lengths), 1), max(lengths, default=0)
+
+def kept_seeds(seeds: List[int], quarantine_path: str) -> List[int]:
+    # Seeds that failed during collection are left out, so that the episodes of a dataset line up with the seeds
+    # of its manifest. Episodes quarantined by validate_dataset.py have an index: they are stored, so their seeds stay.
+    quarantined = {episode['seed'] for episode in load_quarantine(quarantine_path) if episode['index'] is None}
+    return [seed for seed in seeds if seed not in quarantined]
 
-    for _ in range(num_trajectories):
-        policy = expert() # policy is not markovian and must be reinitialized for each trajectory
-        obs, info = env.reset(seed=random.randint(0, 10**9))
-        done = False
-        trajectory = []
+def quarantine_episode(quarantine_path: str, seed: int, failure: dict):
+    # Recorded right away, so that a resumed run skips the seed as well
+    print(f"Quarantined: {'; '.join(failure['problems'])}")
+    add_quarantine(quarantine_path, [{'index': None, 'seed': seed, **failure}])
 
-        while not done:
-            action = policy.select_action(obs)
-            trajectory.append((obs, action))
-            obs, reward, terminated, truncated, info = env.step(action)
-            done = terminated or truncated
+def sweep_configs(spec: dict) -> List[Tuple[str, dict]]:
+    """Expand a grid spec into the (env_name, options) of every combination of its values.
 
-        assert info['success']
-        trajectories.append((trajectory, policy.get_memory_associations()))
-        avg_len += len(trajectory)
-        max_len = max(max_len, len(trajectory))
+    Raises ValueError if the spec has a key that no env takes, or lacks env or length.
+    """
+    unknown = sorted(set(spec) - set(SWEEP_KEYS))
+    if unknown:
+        raise ValueError(f'unknown sweep spec keys {unknown}, expected some of {list(SWEEP_KEYS)}')
+    missing = [k for k in ('env', 'length') if k not in spec]
+    if missing:
+        raise ValueError(f'the sweep spec has no {" or ".join(missing)} values')
+    values = {k: v if isinstance(v, list) else [v] for k, v in spec.items()}
+    for k, v in values.items():
+        if not v:
+            raise ValueError(f'the sweep spec has an empty list of {k} values')
+    for env_name in values['env']:
+        if env_name not in EXPERTS:
+            raise ValueError(f'unknown env {env_name} in the sweep spec, expected one of {list(EXPERTS)}')
+    counting = [k for k in COUNTING_OPTIONS if k in values]
+    if counting and 'LTMB-Counting-v0' not in values['env']:
+        raise ValueError(f'the sweep spec has {" and ".join(counting)} values but no LTMB-Counting-v0, the only env that takes them')
+    configs = []
+    for env_name in values['env']:
+        keys = ['length'] + [k for k in COUNTING_OPTIONS if k in values and env_name == 'LTMB-Counting-v0']
+        for combination in itertools.product(*[values[k] for k in keys]):
+            configs.append((env_name, dict(zip(keys, combination))))
+    return configs
 
+def config_name(env_name: str, options: dict) -> str:
+    # e.g. counting_length20_test_freq0.3
+    return '_'.join([env_name.split('-')[1].lower()] + [f'{k}{v}' for k, v in options.items()])
+
+def expected_length(env_name: str, expert: Type[Policy], options: dict, seeds: List[int]) -> float:
+    # Average length of a few episodes, used to start the most expensive configurations first
+    env = gym.make(env_name, fast_obs=True, disable_env_checker=True, **options)
+    policy = expert()
+    lengths = []
+    for seed in seeds:
+        try:
+            lengths.append(len(run_episode(env, policy, seed)[0]))
+        except Exception:
+            pass # quarantined when the configuration is collected
     env.close()
-    return trajectories, avg_len / num_trajectories, max_len
+    return sum(lengths) / max(len(lengths), 1)
+
+def written_episodes(path: str, seeds: List[int]) -> Tuple[int, bool]:
+    # Number of episodes committed to the columnar dataset at path, and whether it was completed.
+    # Checked before anything is collected, so a sweep rerun with another seed or number of runs stops
+    # up front instead of skipping or extending datasets of other episodes.
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return 0, False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('seeds_hash') not in (None, seeds_hash(seeds)):
+        raise ValueError(f'cannot resume {path}: it was collected with different seeds')
+    return meta['num_episodes'], meta['complete']
+
+def run_sweep(spec: dict, output: str, runs: int, seed: int, workers: int = 1, chunk_size: int = 100, image_encoding: str = 'raw', queue_size: int = 64):
+    """Write one columnar dataset per configuration of spec into output, sharing one pool of workers.
+
+    Every configuration uses the episode seeds of a single run with the same seed, so its dataset is the
+    same as running this script for it alone. Configurations whose datasets are complete are skipped and
+    interrupted ones are resumed. Episodes that fail are quarantined in the quarantine file of their dataset.
+    """
+    runs = spec.get('runs', runs)
+    rng = random.Random(spec.get('seed', seed))
+    seeds = [rng.randint(0, 10**9) for _ in range(runs)]
+    configs = sweep_configs(spec) # checked before anything is written
+    os.makedirs(output, exist_ok=True)
+
+    index, pending = [], []
+    for env_name, options in configs:
+        name = config_name(env_name, options)
+        path = os.path.join(output, name + '.ltmb')
+        entry = {'name': name, 'env': env_name, 'options': options, 'path': name + '.ltmb', 'num_episodes': runs}
+        index.append(entry)
+        written, complete = written_episodes(path, seeds)
+        quarantine_path = os.path.join(path, QUARANTINE_FILE)
+        if written == 0 and os.path.exists(quarantine_path):
+            os.remove(quarantine_path) # left over from an earlier run whose episodes are all collected again
+        config_seeds = kept_seeds(seeds, quarantine_path)
+        entry['num_episodes'] = len(config_seeds)
+        if complete and written >= len(config_seeds):
+            print(f"{name}: skipped, {written} episodes already exist")
+            continue
+        expert = EXPERTS[env_name]
+        pending.append((name, path, env_name, expert, options, config_seeds, written, entry, expected_length(env_name, expert, options, seeds[:2])))
+
+    # Longest expected episodes first (LPT scheduling), so that the shards of short configurations fill
+    # the pool at the end instead of one long configuration running alone
+    pending.sort(key=lambda config: -config[-1])
+    tasks = []
+    for name, path, env_name, expert, options, config_seeds, written, _, _ in pending:
+        tasks += shard_tasks(env_name, expert, options, config_seeds[written:], workers)
+
+    # Shards come back in task order, so the episodes of one configuration arrive together and in seed order
+    worker_stats = {}
+    results = iter_tasks(tasks, workers, worker_stats, quarantine=True)
+    for name, path, env_name, expert, options, config_seeds, written, entry, length in pending:
+        quarantine_path = os.path.join(path, QUARANTINE_FILE)
+        with ColumnarWriter(path, env_name, options, chunk_size=chunk_size, resume=True, image_encoding=image_encoding, seeds=seeds) as writer:
+            profile_writer(writer)
+            Manifest(env_name, options, config_seeds, expert).save(os.path.join(path, MANIFEST_FILE))
+            quarantined = 0
+            with PipelinedWriter(lambda episode: writer.add_episode(*episode), queue_size) as pipeline:
+                for episode_seed in config_seeds[written:]:
+                    _, trajectory, memory_associations = next(results)
+                    if trajectory is None:
+                        quarantine_episode(quarantine_path, episode_seed, memory_associations)
+                        quarantined += 1
+                        continue
+                    pipeline.put((trajectory, memory_associations))
+            if quarantined:
+                config_seeds = kept_seeds(config_seeds, quarantine_path)
+                entry['num_episodes'] = len(config_seeds)
+                Manifest(env_name, options, config_seeds, expert).save(os.path.join(path, MANIFEST_FILE))
+        resumed = f", resumed from episode {written}" if written else ""
+        print(f"{name}: {len(config_seeds) - written} episodes, expected length {length:.1f}{resumed}")
+    results.close()
+
+    with open(os.path.join(output, SWEEP_FILE), 'w') as f:
+        json.dump({'spec': spec, 'runs': runs, 'seed': spec.get('seed', seed), 'datasets': index}, f, indent=2)
+    for pid, (num_episodes, elapsed) in sorted(worker_stats.items()):
+        print(f"Worker {pid}: {num_episodes} episodes, {num_episodes / elapsed:.1f} episodes/sec")
 
 def main():
     parser = argparse.ArgumentParser(description='Collect and save trajectories from a Gym environment.')
-    parser.add_argument('--filename', type=str, required=True, help='Output file name for saved trajectories. (*.pkl)')
+    parser.add_argument('--filename', type=str, required=True, help='Output path for saved trajectories. (directory for columnar, *.pkl for pickle, *.json for manifest)')
+    parser.add_argument('--format', type=str, default='columnar', choices=['columnar', 'pickle', 'manifest'], help='Dataset format. manifest only saves the seeds needed to regenerate the episodes.')
     parser.add_argument('--runs', type=int, default=2, help='Number of trajectories to collect.')
-    parser.add_argument('--env', type=str, required=True, choices=['LTMB-Hallway-v0', 'LTMB-Ordering-v0', 'LTMB-Counting-v0'], help='Gym environment name.')
+    parser.add_argument('--env', type=str, default=None, choices=list(EXPERTS), help='Gym environment name.')
     parser.add_argument('--seed', type=int, default=0, help='Random seed.')
     parser.add_argument('--length', type=int, default=10, help='Length of the task.')
     parser.add_argument('--test_freq', type=float, default=0.3, help='Frequency of test rooms for Counting task.')
+    parser.add_argument('--empty_freq', type=float, default=None, help='Frequency of empty object cells for Counting task. (defaults to 0.1)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes used to collect trajectories.')
+    parser.add_argument('--image_encoding', type=str, default='raw', choices=['raw', 'dedup'], help='Store every image (raw) or every distinct image once (dedup) (columnar format only).')
+    parser.add_argument('--chunk_size', type=int, default=100, help='Number of episodes written to disk at a time (columnar format only).')
+    parser.add_argument('--queue_size', type=int, default=64, help='Number of finished episodes that can wait to be written before collection pauses (columnar format only).')
+    parser.add_argument('--resume', action='store_true', help='Resume an interrupted run from its last completed chunk (columnar format only).')
     parser.add_argument('--record', action='store_true', help='Record a video of the expert policy.')
+    parser.add_argument('--sweep', type=str, default=None, help='JSON grid spec of env, length, test_freq and empty_freq values. One dataset per combination is written into the --filename directory.')
+    parser.add_argument('--profile', action='store_true', help='Print the time spent in each phase of collection and writing.')
+    parser.add_argument('--trace', type=str, default=None, help='Also save every profiled call to this file as a Chrome trace (implies --profile).')
     args = parser.parse_args()
 
+    if args.profile or args.trace is not None:
+        # Set in the environment so that the worker processes profile as well
+        os.environ[profiling.ENV_VAR] = 'trace' if args.trace is not None else '1'
+
+    if args.sweep is not None:
+        if args.format != 'columnar':
+            parser.error('--sweep is only supported for the columnar format')
+        with open(args.sweep) as f:
+            spec = json.load(f)
+        run_sweep(spec, args.filename, args.runs, args.seed, args.workers, args.chunk_size, args.image_encoding, args.queue_size)
+        report_profile(args.trace)
+        return
+    if args.env is None:
+        parser.error('--env is required unless --sweep is given')
+
     random.seed(args.seed)
+    # Per-episode seeds are drawn up front from the master seed so they do not depend on the number of workers
+    seeds = [random.randint(0, 10**9) for _ in range(args.runs)]
 
     options = {'length': args.length}
-    expert = None
-    if args.env == 'LTMB-Hallway-v0':
-        expert = ExpertHallwayPolicy
-    elif args.env == 'LTMB-Ordering-v0':
-        expert = ExpertOrderingPolicy
-    elif args.env == 'LTMB-Counting-v0':
-        expert = ExpertCountingPolicy
+    expert = EXPERTS[args.env]
+    if args.env == 'LTMB-Counting-v0':
         options['test_freq'] = args.test_freq
-    assert expert is not None
+        if args.empty_freq is not None:
+            options['empty_freq'] = args.empty_freq
+
+    manifest = Manifest(args.env, options, seeds, expert)
+    if args.format == 'manifest':
+        manifest.save(args.filename)
+        print(f"Saved a manifest of {args.runs} episodes")
+        return
+
+    worker_stats = {}
+    if args.format == 'pickle':
+        if args.resume:
+            parser.error('--resume is only supported for the columnar format')
+        quarantine = []
+        trajectories, avg_len, max_len = collect_trajectories(args.env, expert, args.runs, options, seeds, args.workers, quarantine, worker_stats)
+        with open(args.filename, 'wb') as f, profiling.phase('pickle.dump'):
+            pickle.dump(trajectories, f)
+        if quarantine:
+            add_quarantine(args.filename + '.' + QUARANTINE_FILE, quarantine)
+    else:
+        # Episodes are written in chunks as they finish, so memory stays flat and an interrupted run can be resumed.
+        # Writing happens on a separate thread, so collection continues while episodes are encoded and flushed.
+        # The writer refuses to resume a dataset whose episodes were drawn from another --seed or --runs
+        with ColumnarWriter(args.filename, args.env, options, chunk_size=args.chunk_size, resume=args.resume, image_encoding=args.image_encoding, seeds=seeds) as writer:
+            profile_writer(writer)
+            quarantine_path = os.path.join(args.filename, QUARANTINE_FILE)
+            if writer.num_episodes > 0:
+                print(f"Resuming from episode {writer.num_episodes}")
+            elif os.path.exists(quarantine_path):
+                os.remove(quarantine_path) # left over from an earlier run whose episodes are all collected again
+            # Episodes that fail are quarantined and their seeds left out of the manifest
+            seeds = kept_seeds(seeds, quarantine_path)
+            Manifest(args.env, options, seeds, expert).save(os.path.join(args.filename, MANIFEST_FILE))
+            total_len, max_len, quarantined = writer.num_steps, 0, 0
+            with PipelinedWriter(lambda episode: writer.add_episode(*episode), args.queue_size) as pipeline:
+                todo = seeds[writer.num_episodes:]
+                for seed, (trajectory, memory_associations) in zip(todo, iter_trajectories(args.env, expert, todo, options, args.workers, worker_stats, quarantine=True)):
+                    if trajectory is None:
+                        quarantine_episode(quarantine_path, seed, memory_associations)
+                        quarantined += 1
+                        continue
+                    pipeline.put((trajectory, memory_associations))
+                    total_len += len(trajectory)
+                    max_len = max(max_len, len(trajectory))
+            if quarantined:
+                seeds = kept_seeds(seeds, quarantine_path)
+                Manifest(args.env, options, seeds, expert).save(os.path.join(args.filename, MANIFEST_FILE))
+            avg_len = total_len / max(len(seeds), 1)
+        stats = pipeline.stats()
+        dataset = ColumnarDataset(args.filename) if args.image_encoding == 'dedup' else None
+        if dataset is not None and dataset.meta['num_frames'] == 0:
+            print("Images: no frames stored") # every episode was quarantined, or a resume had nothing left to collect
+        elif dataset is not None:
+            image_bytes = dataset.nbytes()['frames'] + dataset.nbytes()['frame_index']
+            raw_bytes = dataset.meta['num_steps'] * dataset.frames[0].nbytes
+            print(f"Images: {dataset.meta['num_frames']} distinct frames, {image_bytes / 2**20:.2f} MiB instead of {raw_bytes / 2**20:.2f} MiB raw ({raw_bytes / image_bytes:.1f}x smaller)")
 
-    trajectories, avg_len, max_len = collect_trajectories(args.env, expert, args.runs, options)
     print("Average length: ", avg_len)
     print("Max length: ", max_len)
-    with open(args.filename, 'wb') as f:
-        pickle.dump(trajectories, f)
-    
+    for pid, (num_episodes, elapsed) in sorted(worker_stats.items()):
+        print(f"Worker {pid}: {num_episodes} episodes, {num_episodes / elapsed:.1f} episodes/sec")
+    if args.format == 'columnar':
+        print(f"Queue: collection blocked on a full queue for {stats['put_wait']:.2f}s, the writer waited for episodes for {stats['get_wait']:.2f}s, "
+              f"peak size {stats['max_queue_size']}/{stats['queue_size']}")
+        print(f"Writer: {stats['items']} episodes, {stats['write_time']:.2f}s busy, {stats['items'] / max(stats['write_time'], 1e-9):.1f} episodes/sec")
+        print(f"Total: {stats['items'] / stats['elapsed']:.1f} episodes/sec")
+
+    report_profile(args.trace)
+
     if args.record:
         record_video(args.env, expert, args.filename, options)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
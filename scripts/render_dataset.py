@@ -0,0 +1,49 @@
+import argparse
+import os
+import time
+import numpy as np
+from ltmb.data import ColumnarDataset
+from ltmb.envs.render import render_pov, write_video
+from ltmb.envs.view import AGENT_VIEW_SIZE
+
+def render_array(dataset: ColumnarDataset, path: str, tile_size: int, batch_size: int):
+    # One frame per step, in the order of the dataset's steps, so episode i is pixels[episode_offsets[i]:episode_offsets[i + 1]]
+    num_steps = dataset.meta['num_steps']
+    size = AGENT_VIEW_SIZE * tile_size
+    pixels = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(num_steps, size, size, 3))
+    for start in range(0, num_steps, batch_size):
+        end = min(start + batch_size, num_steps)
+        if dataset.image_encoding == 'raw':
+            images = dataset.image[start:end]
+        else:
+            images = dataset.frames[dataset.frame_index[start:end]]
+        render_pov(images, tile_size, out=pixels[start:end])
+    pixels.flush()
+    return num_steps
+
+def main():
+    parser = argparse.ArgumentParser(description='Render the image observations of a columnar dataset as pixels.')
+    parser.add_argument('--dataset', type=str, required=True, help='Columnar dataset directory.')
+    parser.add_argument('--output', type=str, default=None, help='Output .npy file with one frame per step. (defaults to pixels_<tile_size>.npy in the dataset directory)')
+    parser.add_argument('--tile_size', type=int, default=12, help='Size of tiles in pixels.')
+    parser.add_argument('--batch_size', type=int, default=4096, help='Number of steps rendered at a time.')
+    parser.add_argument('--video', type=str, default=None, help='Also encode episodes as videos in this directory (requires imageio).')
+    parser.add_argument('--episodes', type=int, default=10, help='Number of episodes encoded as videos.')
+    parser.add_argument('--fps', type=int, default=10, help='Frame rate of the videos.')
+    args = parser.parse_args()
+
+    dataset = ColumnarDataset(args.dataset)
+    output = args.output or os.path.join(args.dataset, f'pixels_{args.tile_size}.npy')
+    start = time.perf_counter()
+    num_steps = render_array(dataset, output, args.tile_size, args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {num_steps} frames to {output} in {elapsed:.2f}s ({num_steps / max(elapsed, 1e-9):.0f} frames/sec)")
+
+    if args.video is not None:
+        os.makedirs(args.video, exist_ok=True)
+        for i in range(min(args.episodes, len(dataset))):
+            write_video(os.path.join(args.video, f'episode_{i}.mp4'), [render_pov(dataset[i]['image'], args.tile_size)], args.fps)
+        print(f"Saved {min(args.episodes, len(dataset))} videos to {args.video}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+import time
+from ltmb.data import ColumnarDataset, Manifest, MANIFEST_FILE, QUARANTINE_FILE, add_quarantine, validate_episodes
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay the episodes of a dataset next to its expert policy and report the ones that disagree.')
+    parser.add_argument('--dataset', type=str, default=None, help='Columnar dataset directory, validated against its manifest.json.')
+    parser.add_argument('--manifest', type=str, default=None, help='Manifest file. Without --dataset, the expert is rolled out on its seeds instead.')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes used to replay episodes.')
+    parser.add_argument('--start', type=int, default=0, help='First episode to validate.')
+    parser.add_argument('--count', type=int, default=None, help='Number of episodes to validate. (defaults to all)')
+    parser.add_argument('--quarantine', action='store_true', help='Record the failing episodes in the quarantine.json of the dataset.')
+    args = parser.parse_args()
+
+    if args.dataset is None and args.manifest is None:
+        parser.error('--dataset or --manifest is required')
+    if args.quarantine and args.dataset is None:
+        parser.error('--quarantine requires --dataset')
+    manifest = Manifest.load(args.manifest or os.path.join(args.dataset, MANIFEST_FILE))
+    dataset = ColumnarDataset(args.dataset) if args.dataset is not None else None
+    # An interrupted dataset only holds the episodes of the first seeds of its manifest
+    num_episodes = len(manifest) if dataset is None else min(len(dataset), len(manifest))
+    end = num_episodes if args.count is None else min(num_episodes, args.start + args.count)
+    indices = range(args.start, end)
+
+    failures = []
+    start = time.perf_counter()
+    for done, (k, problems) in enumerate(validate_episodes(manifest, dataset, indices, args.workers), 1):
+        if problems:
+            print(f"Episode {k} (seed {manifest.seeds[k]}): {'; '.join(problems)}")
+            failures.append({'index': k, 'seed': manifest.seeds[k], 'problems': problems})
+        if done % 1000 == 0:
+            print(f"{done}/{len(indices)} episodes validated, {len(failures)} failed")
+    elapsed = time.perf_counter() - start
+    print(f"Validated {len(indices)} episodes in {elapsed:.1f}s ({len(indices) / max(elapsed, 1e-9):.1f} episodes/sec), {len(failures)} failed")
+
+    if args.quarantine and failures:
+        add_quarantine(os.path.join(args.dataset, QUARANTINE_FILE), failures)
+        print(f"Quarantined {len(failures)} episodes in {os.path.join(args.dataset, QUARANTINE_FILE)}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from ltmb.data.pipeline import PipelinedWriter
+from ltmb.data.rollout import TASKS_IN_FLIGHT, map_tasks
+
+WORKERS = 2
+NUM_TASKS = 100
+
+def _touch(task):
+    directory, k = task
+    open(os.path.join(directory, str(k)), 'w').close()
+    return k
+
+def test_blocked_writer_stalls_workers(tmp_path):
+    release = threading.Event()
+    written = []
+
+    def write(k):
+        release.wait()
+        written.append(k)
+
+    tasks = [(str(tmp_path), k) for k in range(NUM_TASKS)]
+    with PipelinedWriter(write, queue_size=1) as writer:
+        results = map_tasks(_touch, tasks, WORKERS)
+
+        def produce():
+            for k in results:
+                writer.put(k)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        time.sleep(1)
+        started = len(os.listdir(tmp_path))
+        release.set()
+        producer.join()
+    # The writer holds one result and the queue another, the producer waits with a third, and only
+    # TASKS_IN_FLIGHT tasks per worker are handed out beyond those
+    assert started <= TASKS_IN_FLIGHT * WORKERS + 3
+    assert written == list(range(NUM_TASKS))
+    assert len(os.listdir(tmp_path)) == NUM_TASKS
+
+def test_results_stay_in_order(tmp_path):
+    tasks = [(str(tmp_path), k) for k in range(NUM_TASKS)]
+    assert list(map_tasks(_touch, tasks, WORKERS)) == list(range(NUM_TASKS))
+    assert list(map_tasks(_touch, tasks, 1)) == list(range(NUM_TASKS))
+
+def test_start_method_stays_unset(tmp_path):
+    # Runs in a fresh interpreter, since anything else in this one may have set the start method already
+    code = (
+        'import multiprocessing, sys\n'
+        'from ltmb.data.rollout import map_tasks\n'
+        'from tests.test_backpressure import _touch\n'
+        'if __name__ == "__main__":\n'
+        '    list(map_tasks(_touch, [(sys.argv[1], k) for k in range(4)], 2))\n'
+        '    assert multiprocessing.get_start_method(allow_none=True) is None\n'
+        '    multiprocessing.set_start_method("spawn")\n'
+    )
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    result = subprocess.run([sys.executable, '-c', code, str(tmp_path)], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from ltmb.envs import CountingEnv, HallwayEnv, OrderingEnv
+from ltmb.policies import (BatchedExpertCountingPolicy, BatchedExpertHallwayPolicy, BatchedExpertOrderingPolicy,
+                           ExpertCountingPolicy, ExpertHallwayPolicy, ExpertOrderingPolicy)
+from ltmb.vector import make_batched
+
+TASKS = {
+    'LTMB-Hallway-v0': (HallwayEnv, ExpertHallwayPolicy, BatchedExpertHallwayPolicy),
+    'LTMB-Ordering-v0': (OrderingEnv, ExpertOrderingPolicy, BatchedExpertOrderingPolicy),
+    'LTMB-Counting-v0': (CountingEnv, ExpertCountingPolicy, BatchedExpertCountingPolicy),
+}
+NUM_ENVS = 6
+EPISODES_PER_ENV = 3
+
+def _check_batch_matches(env_name, options, batched_policy):
+    # Every slot of the batch runs EPISODES_PER_ENV episodes, reset with a new seed as soon as the previous
+    # one ends, next to a reference env and expert that replay the same seeds one episode at a time
+    env_class, expert, _ = TASKS[env_name]
+    batched = make_batched(env_name, NUM_ENVS, **options)
+    references = [env_class(**options) for _ in range(NUM_ENVS)]
+    experts = [expert() for _ in range(NUM_ENVS)]
+    seeds = iter(range(1000, 1000 + NUM_ENVS * EPISODES_PER_ENV))
+
+    def reset(i):
+        seed = next(seeds)
+        batched_obs, _ = batched.reset(seed=[seed], indices=[i])
+        batched_policy.reset([i])
+        experts[i].reset()
+        obs, _ = references[i].reset(seed=seed)
+        associations[i] = []
+        return batched_obs, obs
+
+    associations = [[] for _ in range(NUM_ENVS)]
+    observations = [None] * NUM_ENVS
+    for i in range(NUM_ENVS):
+        batched_obs, observations[i] = reset(i)
+    episodes = np.zeros(NUM_ENVS, dtype=np.int64)
+    num_successes = 0
+    while np.any(episodes < EPISODES_PER_ENV):
+        alive = episodes < EPISODES_PER_ENV
+        for i in np.flatnonzero(alive):
+            assert np.array_equal(batched_obs['image'][i], observations[i]['image'])
+            assert batched_obs['direction'][i] == observations[i]['direction']
+
+        actions, step_associations = batched_policy.select_actions(batched_obs)
+        for env, query, key in step_associations:
+            associations[env].append((query, key))
+        for i in np.flatnonzero(alive):
+            assert actions[i] == experts[i].select_action(observations[i])
+
+        # Episodes that are done keep stepping in the batch, but are not compared any more
+        batched_obs, reward, terminated, truncated, info = batched.step(actions)
+        for i in np.flatnonzero(alive):
+            observations[i], ref_reward, ref_terminated, ref_truncated, ref_info = references[i].step(actions[i])
+            assert np.isclose(reward[i], ref_reward)
+            assert (terminated[i], truncated[i]) == (ref_terminated, ref_truncated)
+            assert info['success'][i] == ref_info.get('success', False)
+            if ref_terminated or ref_truncated:
+                num_successes += ref_info.get('success', False)
+                expected = experts[i].get_memory_association_array()
+                assert np.array_equal(np.array(associations[i], dtype=np.int32).reshape(-1, 2), expected)
+                episodes[i] += 1
+                if episodes[i] < EPISODES_PER_ENV:
+                    batched_obs, observations[i] = reset(i) # the observations of the other episodes are unchanged
+    assert num_successes == NUM_ENVS * EPISODES_PER_ENV
+
+@pytest.mark.parametrize('env_name, options', [
+    ('LTMB-Hallway-v0', {'length': 3}),
+    ('LTMB-Hallway-v0', {'length': 12}),
+    ('LTMB-Ordering-v0', {'length': 5}),
+    ('LTMB-Ordering-v0', {'length': 20}),
+    ('LTMB-Counting-v0', {'length': 6}),
+    ('LTMB-Counting-v0', {'length': 20, 'test_freq': 0.5}),
+])
+def test_batched_matches_reference(env_name, options):
+    _check_batch_matches(env_name, options, TASKS[env_name][2](NUM_ENVS))
+
+def test_batched_counting_grows_capacity():
+    # Objects are seen more often than the initial capacity, so the sightings array has to grow mid-batch
+    policy = BatchedExpertCountingPolicy(NUM_ENVS, capacity=1)
+    _check_batch_matches('LTMB-Counting-v0', {'length': 20}, policy)
+    assert policy.seen_timesteps.shape[2] > 1
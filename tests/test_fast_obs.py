@@ -0,0 +1,57 @@
+import gymnasium as gym
+import numpy as np
+import pytest
+
+import ltmb # registers the envs
+from ltmb.policies import ExpertCountingPolicy, ExpertHallwayPolicy, ExpertOrderingPolicy
+
+EXPERTS = {
+    'LTMB-Hallway-v0': ExpertHallwayPolicy,
+    'LTMB-Ordering-v0': ExpertOrderingPolicy,
+    'LTMB-Counting-v0': ExpertCountingPolicy,
+}
+SEEDS = range(8)
+
+def _make(env_name, **kwargs):
+    return gym.make(env_name, disable_env_checker=True, **kwargs)
+
+def _check_same_episodes(env_name, options, fast_kwargs, policy):
+    # Steps the reference env (fast_obs off) and the fast one with the same actions, chosen by the expert from
+    # the reference observations or at random, and compares everything they return on every step
+    reference = _make(env_name, **options)
+    fast = _make(env_name, **options, **fast_kwargs)
+    expert = EXPERTS[env_name]()
+    for seed in SEEDS:
+        rng = np.random.default_rng(seed)
+        expert.reset()
+        obs, _ = reference.reset(seed=seed)
+        fast_obs, _ = fast.reset(seed=seed)
+        done = False
+        while True:
+            assert np.array_equal(obs['image'], fast_obs['image'])
+            assert obs['direction'] == fast_obs['direction'] and obs['mission'] == fast_obs['mission']
+            if done:
+                break
+            action = expert.select_action(obs) if policy == 'expert' else int(rng.integers(0, reference.action_space.n))
+            obs, reward, terminated, truncated, info = reference.step(action)
+            fast_obs, fast_reward, fast_terminated, fast_truncated, fast_info = fast.step(action)
+            assert (reward, terminated, truncated) == (fast_reward, fast_terminated, fast_truncated)
+            assert info.get('success', False) == fast_info.get('success', False)
+            done = terminated or truncated
+    reference.close()
+    fast.close()
+
+@pytest.mark.parametrize('policy', ['expert', 'random'])
+@pytest.mark.parametrize('env_name, options', [
+    ('LTMB-Hallway-v0', {'length': 5}),
+    ('LTMB-Ordering-v0', {'length': 5}),
+    ('LTMB-Counting-v0', {'length': 5}),
+])
+def test_fast_obs_matches(env_name, options, policy):
+    _check_same_episodes(env_name, options, {'fast_obs': True}, policy)
+
+@pytest.mark.parametrize('policy', ['expert', 'random'])
+@pytest.mark.parametrize('fast_obs', [True, False])
+@pytest.mark.parametrize('length', [1, 2, 3, 12, 40])
+def test_lazy_grid_matches(length, fast_obs, policy):
+    _check_same_episodes('LTMB-Hallway-v0', {'length': length}, {'fast_obs': fast_obs, 'lazy_grid': True}, policy)
@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+
+from ltmb.envs import OrderingEnv
+from ltmb.policies import ExpertOrderingPolicy
+
+NUM_ENVS = 4
+SEEDS = [11, 12, 13, 14]
+
+def _record(episode, obs, reward=None, terminated=None):
+    episode.append((obs['image'].copy(), int(obs['direction']), reward, terminated))
+
+def _sequential():
+    episodes = []
+    for seed in SEEDS:
+        env, policy = OrderingEnv(length=10), ExpertOrderingPolicy()
+        obs, _ = env.reset(seed=seed)
+        episode = []
+        _record(episode, obs)
+        done = False
+        while not done:
+            obs, reward, terminated, truncated, _ = env.step(policy.select_action(obs))
+            _record(episode, obs, reward, terminated)
+            done = terminated or truncated
+        episodes.append(episode)
+    return episodes
+
+def _interleaved():
+    # All envs take one step in turn, and the global random state is disturbed in between, so any state
+    # shared between the envs (such as the module-level random generator) would change their episodes
+    envs = [OrderingEnv(length=10) for _ in range(NUM_ENVS)]
+    policies = [ExpertOrderingPolicy() for _ in range(NUM_ENVS)]
+    episodes = [[] for _ in range(NUM_ENVS)]
+    observations = []
+    for env, seed, episode in zip(envs, SEEDS, episodes):
+        obs, _ = env.reset(seed=seed)
+        _record(episode, obs)
+        observations.append(obs)
+    alive = [True] * NUM_ENVS
+    while any(alive):
+        for i in range(NUM_ENVS):
+            if not alive[i]:
+                continue
+            random.seed(i)
+            obs, reward, terminated, truncated, _ = envs[i].step(policies[i].select_action(observations[i]))
+            _record(episodes[i], obs, reward, terminated)
+            observations[i] = obs
+            alive[i] = not (terminated or truncated)
+    return episodes
+
+def test_interleaved_envs_match_sequential():
+    sequential, interleaved = _sequential(), _interleaved()
+    for a, b in zip(sequential, interleaved):
+        assert len(a) == len(b)
+        for (image, direction, reward, terminated), (other_image, other_direction, other_reward, other_terminated) in zip(a, b):
+            assert np.array_equal(image, other_image)
+            assert (direction, reward, terminated) == (other_direction, other_reward, other_terminated)
+    # The seeds give different episodes, so the comparison above is not between copies of one episode
+    assert not all(np.array_equal(a[0][0], b[0][0]) for a, b in zip(sequential[:-1], sequential[1:]))
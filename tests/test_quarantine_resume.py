@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from ltmb.data import ColumnarDataset, Manifest, MANIFEST_FILE, QUARANTINE_FILE, load_quarantine, validate_episodes
+from ltmb.data.columnar import META_FILE
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RUNS = 30
+CORRUPT = 5 # stored episode whose first action is changed
+
+def _run(script, *args):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    return subprocess.run([sys.executable, os.path.join(ROOT, 'scripts', script), *args], env=env, capture_output=True, text=True)
+
+def _generate(path, *args):
+    result = _run('generate_data.py', '--filename', path, '--runs', str(RUNS), '--env', 'LTMB-Hallway-v0', '--length', '3', '--chunk_size', '10', *args)
+    assert result.returncode == 0, result.stderr
+
+def _quarantine_stored_episode(path):
+    dataset = ColumnarDataset(path)
+    start = int(dataset.episode_offsets[CORRUPT])
+    del dataset
+    actions = np.memmap(os.path.join(path, 'action.bin'), dtype=np.uint8, mode='r+')
+    actions[start] = (actions[start] + 1) % 7
+    actions.flush()
+    del actions
+    result = _run('validate_dataset.py', '--dataset', path, '--quarantine')
+    assert result.returncode == 1, result.stdout + result.stderr
+    assert [episode['index'] for episode in load_quarantine(os.path.join(path, QUARANTINE_FILE))] == [CORRUPT]
+
+def _interrupt(path, num_episodes):
+    # Make the dataset look like a run that was interrupted after its first num_episodes episodes
+    meta_path = os.path.join(path, META_FILE)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    dataset = ColumnarDataset(path)
+    meta.update(num_episodes=num_episodes, num_steps=int(dataset.episode_offsets[num_episodes]),
+                num_associations=int(dataset.memory_offsets[num_episodes]), complete=False)
+    del dataset
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+def _check(path):
+    manifest = Manifest.load(os.path.join(path, MANIFEST_FILE))
+    dataset = ColumnarDataset(path)
+    assert len(manifest) == len(dataset) == RUNS
+    assert manifest.check(dataset) == [CORRUPT]
+
+def test_resume_complete_dataset_keeps_quarantined_seeds(tmp_path):
+    path = str(tmp_path / 'hallway.ltmb')
+    _generate(path)
+    _quarantine_stored_episode(path)
+    _generate(path, '--resume')
+    _check(path)
+
+def test_resume_partial_dataset_keeps_quarantined_seeds(tmp_path):
+    path = str(tmp_path / 'hallway.ltmb')
+    _generate(path)
+    _quarantine_stored_episode(path)
+    _interrupt(path, 10) # after the first chunk, which holds the quarantined episode
+    _generate(path, '--resume')
+    _check(path)
+
+def test_validate_partial_dataset(tmp_path):
+    path = str(tmp_path / 'hallway.ltmb')
+    _generate(path)
+    _interrupt(path, 10)
+    manifest = Manifest.load(os.path.join(path, MANIFEST_FILE))
+    dataset = ColumnarDataset(path)
+    assert list(validate_episodes(manifest, dataset)) == [(k, []) for k in range(10)]
+    assert list(validate_episodes(manifest, dataset, range(5, 20))) == [(k, []) for k in range(5, 10)]
+    result = _run('validate_dataset.py', '--dataset', path, '--count', '10')
+    assert result.returncode == 0, result.stdout + result.stderr
+    # A manifest with fewer seeds than the dataset has episodes cannot describe it
+    with pytest.raises(ValueError):
+        list(validate_episodes(Manifest(manifest.env, manifest.options, manifest.seeds[:5], manifest.policy), dataset))